@@ -0,0 +1,120 @@
+"""
+Answers many degrees of separation queries in one run.
+
+Usage: python batch.py [--compact] [--workers N] directory [pairs.csv]
+
+Reads (source, target) pairs, one per line in CSV format, from the given
+file or from standard input. Each person may be given by IMDB id or by
+name. Queries are grouped by source, so that a single search answers all
+targets of a source, and the results are written to standard output as
+one JSON object per line.
+
+With --workers, the searches are spread over that many processes,
+and each worker's throughput is reported on standard error.
+"""
+
+import argparse
+import csv
+import json
+import sys
+
+import degrees
+import parallel
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Answer many degrees queries.")
+    parser.add_argument("directory")
+    parser.add_argument("pairs", nargs="?", help="CSV file of source,target pairs")
+    parser.add_argument("--compact", action="store_true",
+                        help="load the data into a compact graph")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="number of worker processes")
+    args = parser.parse_args()
+
+    degrees.load_data(args.directory, compact=args.compact)
+
+    if args.pairs:
+        with open(args.pairs, encoding="utf-8", newline="") as f:
+            run(csv.reader(f), args.workers)
+    else:
+        run(csv.reader(sys.stdin), args.workers)
+
+
+def run(rows, workers):
+    """
+    Answers the rows with the given number of workers and
+    writes the results.
+    """
+    if workers == 1:
+        write_results(answer(rows))
+        return
+
+    stats = {}
+
+    def search(pairs):
+        return parallel.parallel_shortest_paths(pairs, workers, stats)
+
+    write_results(answer(rows, search))
+    for pid, rate in parallel.throughput(stats).items():
+        worker = stats[pid]
+        print(f"worker {pid}: {worker['queries']} queries from "
+              f"{worker['sources']} sources, {rate:.1f} queries/s",
+              file=sys.stderr)
+
+
+def answer(rows, search=degrees.batch_shortest_paths):
+    """
+    Yields a result dictionary for each (source, target) row,
+    using search to answer the valid pairs.
+
+    Rows that cannot be answered are reported as soon as they are read;
+    the others are answered after all rows are read, grouped by source.
+    """
+    pairs = []
+    for row in rows:
+        if not row:
+            continue
+        if len(row) != 2:
+            yield {"query": row, "error": "expected a source and a target"}
+            continue
+        source, target = (resolve_person(value) for value in row)
+        if source is None or target is None:
+            yield {"query": row, "error": "person not found or ambiguous"}
+            continue
+        pairs.append((source, target))
+
+    for source, target, path in search(pairs):
+        yield {
+            "source": source,
+            "target": target,
+            "degrees": None if path is None else len(path),
+            "path": path
+        }
+
+
+def resolve_person(value):
+    """
+    Returns the person_id for an IMDB id or an unambiguous name,
+    or None if there is no such person.
+    """
+    value = value.strip()
+    if value in degrees.people:
+        return value
+    person_ids = degrees.names.get(value.lower(), set())
+    if len(person_ids) == 1:
+        return next(iter(person_ids))
+    return None
+
+
+def write_results(results):
+    """
+    Writes each result as a line of JSON, flushing after every line.
+    """
+    for result in results:
+        sys.stdout.write(json.dumps(result) + "\n")
+        sys.stdout.flush()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+"""
+Benchmarks degrees loading and searching on synthetic data.
+
+Usage: python benchmark.py [--people N] [--movies N] [--queries N]
+                           [--alpha A] [--seed S] [--directory DIR]
+                           [--output results.json]
+
+Generates people.csv, movies.csv and stars.csv with power-law cast sizes
+and actor popularity, then, for both the dictionary and the compact
+representations, measures the time and peak memory of load_data and the
+time and number of people explored by each search function over random
+pairs. Results are written as JSON, so runs of different versions can be
+compared.
+"""
+
+import argparse
+import csv
+import importlib
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from itertools import accumulate
+
+import degrees
+
+# Smallest and largest cast generated for a single movie
+MIN_CAST = 4
+MAX_CAST = 500
+
+# Exponent of the Zipf-like popularity of actors
+POPULARITY_EXPONENT = 0.5
+
+
+def generate(directory, num_people, num_movies, alpha, seed):
+    """
+    Writes synthetic CSV files to directory and returns the number of
+    stars. Cast sizes follow a Pareto distribution with shape alpha, and
+    actors are picked with Zipf-like popularity, so a few hub actors
+    appear in many movies.
+    """
+    rng = random.Random(seed)
+    with open(f"{directory}/people.csv", "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["id", "name", "birth"])
+        for i in range(num_people):
+            writer.writerow([str(i + 1), f"Person {i + 1}", str(rng.randint(1900, 2010))])
+
+    with open(f"{directory}/movies.csv", "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["id", "title", "year"])
+        for i in range(num_movies):
+            writer.writerow([str(i + 1), f"Movie {i + 1}", str(rng.randint(1920, 2020))])
+
+    # Popularidade decrescente com o posto do ator
+    cumulative = list(accumulate(
+        (rank + 1) ** -POPULARITY_EXPONENT for rank in range(num_people)
+    ))
+    stars = 0
+    with open(f"{directory}/stars.csv", "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["person_id", "movie_id"])
+        for movie in range(num_movies):
+            cast = min(MAX_CAST, num_people, int(MIN_CAST * rng.paretovariate(alpha)))
+            for person in set(rng.choices(range(num_people), cum_weights=cumulative, k=cast)):
+                writer.writerow([str(person + 1), str(movie + 1)])
+                stars += 1
+    return stars
+
+
+def measure_load(directory, compact):
+    """
+    Returns the reloaded degrees module and a dictionary with the time
+    and peak traced memory of loading directory, measured in separate
+    loads since tracing slows allocation down. For the compact graph,
+    the time to load its snapshot is also measured.
+    """
+    result = {}
+    module = importlib.reload(degrees)
+    start = time.perf_counter()
+    module.load_data(directory, compact=compact)
+    result["load_seconds"] = time.perf_counter() - start
+
+    if compact:
+        module = importlib.reload(degrees)
+        start = time.perf_counter()
+        module.load_data(directory, compact=True)
+        result["snapshot_load_seconds"] = time.perf_counter() - start
+
+    module = importlib.reload(degrees)
+    tracemalloc.start()
+    if compact:
+        # Sem o snapshot, mede a memoria do grafo construido a partir dos CSVs
+        module.load_compact_data(directory, use_snapshot=False)
+    else:
+        module.load_data(directory)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    result["load_peak_bytes"] = peak
+    return module, result
+
+
+def measure_search(module, function, pairs):
+    """
+    Returns timing and exploration statistics of a search function
+    over (source, target) pairs.
+    """
+    seconds = []
+    explored = []
+    lengths = []
+    for source, target in pairs:
+        start = time.perf_counter()
+        path = function(source, target)
+        seconds.append(time.perf_counter() - start)
+        explored.append(module.num_explored)
+        if path is not None:
+            lengths.append(len(path))
+    ordered = sorted(seconds)
+    return {
+        "queries": len(pairs),
+        "connected": len(lengths),
+        "mean_degrees": statistics.mean(lengths) if lengths else None,
+        "mean_ms": statistics.mean(seconds) * 1000,
+        "median_ms": statistics.median(seconds) * 1000,
+        "p90_ms": ordered[int(0.9 * (len(ordered) - 1))] * 1000,
+        "mean_explored": statistics.mean(explored),
+        "max_explored": max(explored)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark degrees.")
+    parser.add_argument("--people", type=int, default=20000)
+    parser.add_argument("--movies", type=int, default=10000)
+    parser.add_argument("--queries", type=int, default=20)
+    parser.add_argument("--alpha", type=float, default=1.5,
+                        help="shape of the Pareto distribution of cast sizes")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--directory",
+                        help="where to write the CSV files (default: a temporary directory)")
+    parser.add_argument("--output", help="JSON file for the results (default: stdout)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as temporary:
+        directory = args.directory or temporary
+        os.makedirs(directory, exist_ok=True)
+        print("Generating data...", file=sys.stderr)
+        stars = generate(directory, args.people, args.movies, args.alpha, args.seed)
+
+        rng = random.Random(args.seed + 1)
+        pairs = [(str(rng.randint(1, args.people)), str(rng.randint(1, args.people)))
+                 for _ in range(args.queries)]
+
+        results = {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "parameters": {**vars(args), "stars": stars},
+            "runs": {}
+        }
+        for compact in (False, True):
+            name = "compact" if compact else "dict"
+            print(f"Benchmarking {name} representation...", file=sys.stderr)
+            module, run = measure_load(directory, compact)
+            for search in ("shortest_path", "bidirectional_shortest_path"):
+                run[search] = measure_search(module, getattr(module, search), pairs)
+            results["runs"][name] = run
+
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
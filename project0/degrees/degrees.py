@@ -1,7 +1,17 @@
 import csv
+import gzip
+import heapq
+import itertools
+import math
+import operator
+import os
 import sys
+import time
 
-from util import Node, StackFrontier, QueueFrontier
+import snapshot
+from graph import Graph, MoviesView, NamesView, PeopleView
+from nameindex import NAMES_NAME, NameIndex
+from util import LRUCache, Node, StackFrontier, QueueFrontier
 
 # Maps names to a set of corresponding person_ids
 names = {}
@@ -12,54 +22,248 @@ people = {}
 # Maps movie_ids to a dictionary of: title, year, stars (a set of person_ids)
 movies = {}
 
+# Compact integer-indexed graph; when set, names, people and movies
+# are read-only views over it
+graph = None
 
-def load_data(directory):
+# Cache of neighbors_for_person results, if enabled
+neighbor_cache = None
+
+# Prefix and fuzzy search index over names, built on first use
+name_index = None
+
+# Landmark distance oracle kept up to date by add_person and add_star, if set
+landmark_oracle = None
+
+# Journal of the changes made to a compact graph loaded with a snapshot
+journal = None
+
+# Number of people expanded by the most recent search
+num_explored = 0
+
+# Estimated memory used by each (movie_id, person_id) pair in the cache
+PAIR_SIZE = sys.getsizeof(("", ""))
+
+# Number of CSV rows parsed at a time by load_data
+CHUNK_SIZE = 100000
+
+
+def load_data(directory, compact=False, progress=None):
     """
     Load data from CSV files into memory.
+
+    The files are read in chunks of rows, and may be gzip-compressed
+    (people.csv.gz, ...). If given, progress is called after every chunk
+    with the file name, the number of rows read so far and the rate in
+    rows per second.
+
+    If compact is True, the data is stored in a Graph instead of
+    dictionaries of sets, using a few bytes per star, and cached in
+    a binary snapshot next to the CSV files.
     """
+    if compact:
+        load_compact_data(directory, progress=progress)
+        return
+
+    global graph, names, people, movies, name_index, landmark_oracle, journal
+    name_index = None
+    landmark_oracle = None
+    journal = None
+    if neighbor_cache is not None:
+        neighbor_cache.clear()
+    if graph is not None:
+        graph = None
+        names, people, movies = {}, {}, {}
+
     # Load people
-    with open(f"{directory}/people.csv", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            people[row["id"]] = {
-                "name": row["name"],
-                "birth": row["birth"],
-                "movies": set()
-            }
-            if row["name"].lower() not in names:
-                names[row["name"].lower()] = {row["id"]}
-            else:
-                names[row["name"].lower()].add(row["id"])
+    for person_id, name, birth in read_rows(
+        data_file(directory, "people"), "id", "name", "birth", progress=progress
+    ):
+        people[person_id] = {
+            "name": name,
+            "birth": birth,
+            "movies": set()
+        }
+        if name.lower() not in names:
+            names[name.lower()] = {person_id}
+        else:
+            names[name.lower()].add(person_id)
 
     # Load movies
-    with open(f"{directory}/movies.csv", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            movies[row["id"]] = {
-                "title": row["title"],
-                "year": row["year"],
-                "stars": set()
-            }
+    for movie_id, title, year in read_rows(
+        data_file(directory, "movies"), "id", "title", "year", progress=progress
+    ):
+        movies[movie_id] = {
+            "title": title,
+            "year": year,
+            "stars": set()
+        }
 
     # Load stars
-    with open(f"{directory}/stars.csv", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            try:
-                people[row["person_id"]]["movies"].add(row["movie_id"])
-                movies[row["movie_id"]]["stars"].add(row["person_id"])
-            except KeyError:
-                pass
+    for person_id, movie_id in read_rows(
+        data_file(directory, "stars"), "person_id", "movie_id", progress=progress
+    ):
+        try:
+            people[person_id]["movies"].add(movie_id)
+            movies[movie_id]["stars"].add(person_id)
+        except KeyError:
+            pass
+
+
+def load_compact_data(directory, use_snapshot=True, progress=None):
+    """
+    Load data from CSV files into a compact Graph.
+
+    If use_snapshot is True, the graph is memory-mapped from a binary
+    snapshot in the directory when one exists for the current CSV files,
+    and a new snapshot is written otherwise, along with the trigram
+    index used for fuzzy name search. People, movies and stars added
+    since the snapshot was written are replayed from its journal.
+    """
+    global graph, names, people, movies, name_index, landmark_oracle, journal
+    landmark_oracle = None
+    journal = None
+    if neighbor_cache is not None:
+        neighbor_cache.clear()
+
+    filenames = data_files(directory)
+    path = f"{directory}/{snapshot.SNAPSHOT_NAME}"
+    key = snapshot.source_key(filenames)
+
+    names_path = f"{directory}/{NAMES_NAME}"
+
+    graph = snapshot.load(path, key) if use_snapshot else None
+    loaded = graph is not None
+    if not loaded:
+        graph = Graph.build(
+            read_rows(filenames[0], "id", "name", "birth", progress=progress),
+            read_rows(filenames[1], "id", "title", "year", progress=progress),
+            read_rows(filenames[2], "person_id", "movie_id", progress=progress)
+        )
+
+    # Distancias dos landmarks, se landmarks.py ja as calculou; salvas
+    # antes de parte do journal, sao reparadas pelo restante dele
+    from landmarks import LANDMARKS_NAME, LandmarkOracle, saved_revision
+    landmarks_path = f"{directory}/{LANDMARKS_NAME}"
+    revision = saved_revision(landmarks_path, key)
+    if graph.revision == revision:
+        landmark_oracle = LandmarkOracle.load(landmarks_path, graph, key)
+
+    # O snapshot guarda so o grafo construido; as mudancas vem do journal
+    if use_snapshot:
+        journal = snapshot.Journal(f"{path}{snapshot.JOURNAL_SUFFIX}", key)
+        for record in journal.records():
+            _replay(record)
+            if landmark_oracle is None and graph.revision == revision:
+                landmark_oracle = LandmarkOracle.load(landmarks_path, graph, key)
+
+    name_index = NameIndex.from_graph(graph)
+    if use_snapshot:
+        try:
+            if not loaded:
+                snapshot.save(graph, path, key)
+            # O indice de nomes e refeito se estiver ausente ou desatualizado
+            if not name_index.load(names_path, key):
+                name_index.save(names_path, key)
+        except OSError:
+            # Diretorio somente leitura: segue sem snapshot
+            journal = None
+
+    names = NamesView(graph)
+    people = PeopleView(graph)
+    movies = MoviesView(graph)
+
+
+def _replay(record):
+    """
+    Applies a journal record to the graph and, if loaded,
+    to the landmark distances.
+    """
+    kind, *fields = record
+    if kind == "person":
+        person = graph.add_person(*fields)
+        if landmark_oracle is not None:
+            landmark_oracle.add_person(person)
+    elif kind == "movie":
+        graph.add_movie(*fields)
+    elif kind == "star":
+        person_id, movie_id = fields
+        movie = graph.movie_index(movie_id)
+        graph.add_star(graph.person_index(person_id), movie)
+        if landmark_oracle is not None:
+            landmark_oracle.add_star(movie)
+
+
+def data_files(directory):
+    """
+    Returns the paths of the people, movies and stars data files.
+    """
+    return [data_file(directory, name) for name in ("people", "movies", "stars")]
+
+
+def data_file(directory, name):
+    """
+    Returns the path of a data file, preferring name.csv
+    over a gzip-compressed name.csv.gz.
+    """
+    filename = f"{directory}/{name}.csv"
+    if not os.path.exists(filename) and os.path.exists(f"{filename}.gz"):
+        return f"{filename}.gz"
+    return filename
+
+
+def read_rows(filename, *columns, progress=None, chunk_size=CHUNK_SIZE):
+    """
+    Yields tuples with the given columns of each row of a CSV file,
+    parsing it chunk_size rows at a time. Files ending in .gz are
+    decompressed while they are read.
+    """
+    if filename.endswith(".gz"):
+        f = gzip.open(filename, "rt", encoding="utf-8", newline="")
+    else:
+        f = open(filename, encoding="utf-8", newline="")
+    with f:
+        reader = csv.reader(f)
+        header = next(reader)
+        select = operator.itemgetter(*(header.index(column) for column in columns))
+
+        rows = 0
+        start = time.perf_counter()
+        while True:
+            chunk = [select(row) for row in itertools.islice(reader, chunk_size)]
+            if not chunk:
+                break
+            yield from chunk
+            rows += len(chunk)
+            if progress is not None:
+                elapsed = time.perf_counter() - start
+                progress(os.path.basename(filename), rows,
+                         rows / elapsed if elapsed else 0.0)
+
+
+def report_progress(filename, rows, rate):
+    """
+    Prints load_data progress to standard error.
+    """
+    print(f"{filename}: {rows} rows ({rate:,.0f} rows/s)", file=sys.stderr)
 
 
 def main():
-    if len(sys.argv) > 2:
-        sys.exit("Usage: python degrees.py [directory]")
-    directory = sys.argv[1] if len(sys.argv) == 2 else "large"
+    args = sys.argv[1:]
+    options = {option for option in ("--compact", "--progress") if option in args}
+    for option in options:
+        args.remove(option)
+    if len(args) > 1:
+        sys.exit("Usage: python degrees.py [--compact] [--progress] [directory]")
+    directory = args[0] if len(args) == 1 else "large"
 
     # Load data from files into memory
     print("Loading data...")
-    load_data(directory)
+    load_data(
+        directory,
+        compact="--compact" in options,
+        progress=report_progress if "--progress" in options else None
+    )
     print("Data loaded.")
 
     source = person_id_for_name(input("Name: "))
@@ -69,7 +273,7 @@ def main():
     if target is None:
         sys.exit("Person not found.")
 
-    path = shortest_path(source, target)
+    path = bidirectional_shortest_path(source, target)
 
     if path is None:
         print("Not connected.")
@@ -91,6 +295,16 @@ def shortest_path(source, target):
 
     If no possible path, returns None.
     """
+    global num_explored
+
+    # Com o grafo compacto, a busca e feita diretamente sobre os indices
+    if graph is not None:
+        path = graph.shortest_path(
+            graph.person_index(source), graph.person_index(target)
+        )
+        num_explored = graph.num_explored
+        return _person_ids(path)
+
     # Numero de nodes explorados
     num_explored = 0
     
@@ -135,15 +349,209 @@ def shortest_path(source, target):
                 frontier.add(child)
                 
 
-def person_id_for_name(name):
+def bidirectional_shortest_path(source, target):
+    """
+    Returns the shortest list of (movie_id, person_id) pairs
+    that connect the source to the target, searching from both
+    ends at once and stopping where the two frontiers meet.
+
+    If no possible path, returns None.
+    """
+    global num_explored
+    num_explored = 0
+    if source == target:
+        return []
+
+    # Pais de cada pessoa alcancada: person_id -> (movie_id, person_id)
+    # No lado da fonte o par aponta para a pessoa anterior no caminho,
+    # no lado do alvo aponta para a proxima pessoa em direcao ao alvo
+    forward = {source: None}
+    backward = {target: None}
+
+    # Fronteiras de cada lado (um nivel da busca por vez)
+    forward_frontier = [source]
+    backward_frontier = [target]
+
+    while forward_frontier and backward_frontier:
+        # Expande sempre o lado com a menor fronteira
+        if len(forward_frontier) <= len(backward_frontier):
+            frontier, visited, other = forward_frontier, forward, backward
+        else:
+            frontier, visited, other = backward_frontier, backward, forward
+
+        # Expande o nivel inteiro e guarda o melhor encontro entre as buscas
+        meeting = None
+        next_frontier = []
+        num_explored += len(frontier)
+        for person_id in frontier:
+            for movie_id, neighbor in neighbors_for_person(person_id):
+                if neighbor in visited:
+                    continue
+                visited[neighbor] = (movie_id, person_id)
+                next_frontier.append(neighbor)
+                if neighbor in other and (
+                    meeting is None
+                    or _path_length(other, neighbor) < _path_length(other, meeting)
+                ):
+                    meeting = neighbor
+
+        if meeting is not None:
+            return _join_paths(forward, backward, meeting)
+
+        if visited is forward:
+            forward_frontier = next_frontier
+        else:
+            backward_frontier = next_frontier
+
+    # Uma das fronteiras esvaziou, nao ha caminho
+    return None
+
+
+def _path_length(parents, person_id):
+    """
+    Returns the number of steps from person_id to the root
+    of the search tree described by parents.
+    """
+    length = 0
+    while parents[person_id] is not None:
+        person_id = parents[person_id][1]
+        length += 1
+    return length
+
+
+def _join_paths(forward, backward, meeting):
+    """
+    Builds the (movie_id, person_id) path from the source to the
+    target, given the two search trees and the person where they meet.
+    """
+    # Caminho da fonte ate o ponto de encontro
+    solution = []
+    person_id = meeting
+    while forward[person_id] is not None:
+        movie_id, parent = forward[person_id]
+        solution.append((movie_id, person_id))
+        person_id = parent
+    solution.reverse()
+
+    # Caminho do ponto de encontro ate o alvo
+    person_id = meeting
+    while backward[person_id] is not None:
+        movie_id, person_id = backward[person_id]
+        solution.append((movie_id, person_id))
+
+    return solution
+
+
+def shortest_paths(source, targets):
+    """
+    Returns a dictionary mapping each of the targets to the shortest
+    list of (movie_id, person_id) pairs that connect the source to it,
+    or to None if there is no possible path.
+
+    A single breadth-first search from the source answers all targets.
+    """
+    global num_explored
+    num_explored = 0
+
+    if graph is not None:
+        indices = {target: graph.person_index(target) for target in targets}
+        paths = graph.shortest_paths(
+            graph.person_index(source), set(indices.values()) - {None}
+        )
+        num_explored = graph.num_explored
+        return {target: _person_ids(paths.get(index))
+                for target, index in indices.items()}
+
+    # Pais de cada pessoa alcancada: person_id -> (movie_id, person_id)
+    parents = {source: None}
+
+    # Alvos que ainda nao foram alcancados
+    remaining = set(targets) - {source}
+
+    frontier = QueueFrontier()
+    frontier.add(Node(state=source, parent=None, action=None))
+    while remaining and not frontier.empty():
+        node = frontier.remove()
+        num_explored += 1
+        for movie_id, person_id in neighbors_for_person(node.state):
+            if person_id not in parents:
+                parents[person_id] = (movie_id, node.state)
+                remaining.discard(person_id)
+                frontier.add(Node(state=person_id, parent=node, action=movie_id))
+
+    paths = {}
+    for target in targets:
+        if target not in parents:
+            paths[target] = None
+            continue
+        solution = []
+        person_id = target
+        while parents[person_id] is not None:
+            movie_id, parent = parents[person_id]
+            solution.append((movie_id, person_id))
+            person_id = parent
+        solution.reverse()
+        paths[target] = solution
+    return paths
+
+
+def batch_shortest_paths(pairs):
+    """
+    Yields (source, target, path) for each (source, target) pair,
+    grouping the pairs by source so that one search per source
+    answers all of its targets.
+    """
+    for source, targets in group_by_source(pairs).items():
+        paths = shortest_paths(source, targets)
+        for target in targets:
+            yield source, target, paths[target]
+
+
+def group_by_source(pairs):
+    """
+    Returns a dictionary mapping each source of the (source, target)
+    pairs to the list of its targets, both in order of first appearance.
+    """
+    groups = {}
+    for source, target in pairs:
+        groups.setdefault(source, []).append(target)
+    return groups
+
+
+def estimate_degrees(source, target):
+    """
+    Returns (lower, upper) bounds on the degrees of separation between
+    two people, in constant time from the landmark distances when they
+    are loaded, or from an exact search otherwise. Both are math.inf
+    if the people are known not to be connected; upper is math.inf
+    if no bound could be found.
+    """
+    if landmark_oracle is not None:
+        return landmark_oracle.estimate(source, target)
+    solution = bidirectional_shortest_path(source, target)
+    if solution is None:
+        return math.inf, math.inf
+    return len(solution), len(solution)
+
+
+def person_id_for_name(name, birth=None, interactive=True):
     """
     Returns the IMDB id for a person's name,
     resolving ambiguities as needed.
+
+    If birth is given, only people born in that year are considered.
+    If interactive is False, ambiguous names return None instead of
+    asking which person was intended.
     """
     person_ids = list(names.get(name.lower(), set()))
+    if birth is not None:
+        person_ids = [person_id for person_id in person_ids
+                      if people[person_id]["birth"] == str(birth)]
     if len(person_ids) == 0:
         return None
     elif len(person_ids) > 1:
+        if not interactive:
+            return None
         print(f"Which '{name}'?")
         for person_id in person_ids:
             person = people[person_id]
@@ -161,11 +569,139 @@ def person_id_for_name(name):
         return person_ids[0]
 
 
+def search_names(query, limit=10):
+    """
+    Returns up to limit (person_id, name, birth) tuples for the people
+    whose names start with query, followed by those whose names are
+    within a couple of typos of it.
+    """
+    return get_name_index().search(query, limit)
+
+
+def get_name_index():
+    """
+    Returns the name search index, building it if needed.
+    """
+    global name_index
+    if name_index is None:
+        name_index = NameIndex.build(
+            (person_id, person["name"], person["birth"])
+            for person_id, person in people.items()
+        )
+    return name_index
+
+
+def add_person(person_id, name, birth):
+    """
+    Adds a person, who has starred in no movies yet.
+    Raises ValueError if person_id is already in use.
+    """
+    if person_id in people:
+        raise ValueError(f"person {person_id} already exists")
+
+    if graph is not None:
+        person = graph.add_person(person_id, name, birth)
+        if landmark_oracle is not None:
+            landmark_oracle.add_person(person)
+        _record(["person", person_id, name, birth])
+    else:
+        people[person_id] = {
+            "name": name,
+            "birth": birth,
+            "movies": set()
+        }
+        names.setdefault(name.lower(), set()).add(person_id)
+
+    if name_index is not None:
+        name_index.add(person_id, name, birth)
+
+
+def add_movie(movie_id, title, year):
+    """
+    Adds a movie, with no stars yet.
+    Raises ValueError if movie_id is already in use.
+    """
+    if movie_id in movies:
+        raise ValueError(f"movie {movie_id} already exists")
+
+    if graph is not None:
+        graph.add_movie(movie_id, title, year)
+        _record(["movie", movie_id, title, year])
+    else:
+        movies[movie_id] = {
+            "title": title,
+            "year": year,
+            "stars": set()
+        }
+
+
+def add_star(person_id, movie_id):
+    """
+    Records that a person starred in a movie. Returns False if that
+    was already known, True otherwise. Raises KeyError if the person
+    or the movie does not exist.
+
+    Only the cached neighbors of the movie's cast are invalidated.
+    """
+    if person_id not in people:
+        raise KeyError(person_id)
+    if movie_id not in movies:
+        raise KeyError(movie_id)
+
+    if graph is not None:
+        movie = graph.movie_index(movie_id)
+        if not graph.add_star(graph.person_index(person_id), movie):
+            return False
+        if landmark_oracle is not None:
+            landmark_oracle.add_star(movie)
+        _record(["star", person_id, movie_id])
+    else:
+        if movie_id in people[person_id]["movies"]:
+            return False
+        people[person_id]["movies"].add(movie_id)
+        movies[movie_id]["stars"].add(person_id)
+
+    # So o elenco do filme ganhou vizinhos
+    if neighbor_cache is not None:
+        for other in movies[movie_id]["stars"]:
+            neighbor_cache.discard(other)
+    return True
+
+
+def _record(record):
+    """
+    Appends a change to the snapshot's journal, if there is one.
+    """
+    if journal is not None:
+        try:
+            journal.append(record)
+        except OSError:
+            # Diretorio somente leitura: a mudanca vale so em memoria
+            pass
+
+
 def neighbors_for_person(person_id):
     """
     Returns (movie_id, person_id) pairs for people
     who starred with a given person.
     """
+    if neighbor_cache is not None:
+        neighbors = neighbor_cache.get(person_id)
+        if neighbors is None:
+            neighbors = frozenset(_expand_neighbors(person_id))
+            neighbor_cache.put(person_id, neighbors)
+        return neighbors
+    return _expand_neighbors(person_id)
+
+
+def _expand_neighbors(person_id):
+    """
+    Builds the set of (movie_id, person_id) neighbors of a person.
+    """
+    if graph is not None:
+        return {(graph.movie_ids[movie], graph.person_ids[person])
+                for movie, person in graph.neighbors(graph.person_index(person_id))}
+
     movie_ids = people[person_id]["movies"]
     neighbors = set()
     for movie_id in movie_ids:
@@ -174,5 +710,67 @@ def neighbors_for_person(person_id):
     return neighbors
 
 
+def enable_neighbor_cache(max_bytes):
+    """
+    Caches the results of neighbors_for_person in a least recently
+    used cache holding about max_bytes of neighbor sets.
+    Returns the cache, whose hits and misses are counted.
+    """
+    global neighbor_cache
+    neighbor_cache = LRUCache(max_bytes, _neighbors_size)
+    return neighbor_cache
+
+
+def disable_neighbor_cache():
+    global neighbor_cache
+    neighbor_cache = None
+
+
+def precompute_neighbors(n):
+    """
+    Fills the neighbor cache with the neighbors of the n people
+    who have the most co-stars (counted with repetition).
+    """
+    if neighbor_cache is None:
+        raise Exception("neighbor cache is not enabled")
+
+    if graph is not None:
+        top = heapq.nlargest(n, range(graph.num_people), key=graph.degree)
+        person_ids = [graph.person_ids[person] for person in top]
+    else:
+        person_ids = heapq.nlargest(n, people, key=lambda person_id: sum(
+            len(movies[movie_id]["stars"])
+            for movie_id in people[person_id]["movies"]
+        ))
+
+    # Os mais conectados sao inseridos por ultimo para serem os ultimos removidos
+    for person_id in reversed(person_ids):
+        neighbor_cache.put(person_id, frozenset(_expand_neighbors(person_id)))
+
+
+def _neighbors_size(neighbors):
+    """
+    Estimates the memory used by a set of (movie_id, person_id) pairs.
+    """
+    size = sys.getsizeof(neighbors) + len(neighbors) * PAIR_SIZE
+
+    # No grafo compacto os ids sao decodificados a cada expansao, e as
+    # strings pertencem so ao cache
+    if graph is not None:
+        size += sum(sys.getsizeof(movie_id) + sys.getsizeof(person_id)
+                    for movie_id, person_id in neighbors)
+    return size
+
+
+def _person_ids(path):
+    """
+    Converts a path of graph indices into (movie_id, person_id) pairs.
+    """
+    if path is None:
+        return None
+    return [(graph.movie_ids[movie], graph.person_ids[person])
+            for movie, person in path]
+
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,559 @@
+"""
+Compact integer-indexed representation of the people/movies data.
+
+People and movies are mapped to dense integer indices (in order of their
+IMDB ids) and the star relation is stored twice in compressed sparse row
+(CSR) form: for person i, the movies they starred in are
+person_movies[person_offsets[i]:person_offsets[i + 1]], and for movie m,
+its stars are movie_people[movie_offsets[m]:movie_offsets[m + 1]].
+
+People, movies and stars added after the graph is built are kept in small
+overlay lists and dictionaries next to the immutable arrays, with indices
+continuing after the built ones.
+"""
+
+from array import array
+from collections.abc import Mapping
+
+# Typecodes for offsets (may exceed 2**31 on full dumps) and for indices
+OFFSET_TYPE = "q"
+INDEX_TYPE = "i"
+
+# Typecode for degrees of separation, and the distance of unreachable people
+DISTANCE_TYPE = "h"
+UNREACHED = -1
+
+
+class StringTable():
+    """
+    Sequence of strings stored as a single UTF-8 blob plus an array
+    of offsets into it, followed by a list of appended strings.
+    """
+
+    def __init__(self, blob, offsets):
+        self.blob = blob
+        self.offsets = offsets
+        self.appended = []
+
+    @classmethod
+    def from_strings(cls, strings):
+        offsets = array(OFFSET_TYPE, [0])
+        chunks = []
+        size = 0
+        for string in strings:
+            encoded = string.encode("utf-8")
+            chunks.append(encoded)
+            size += len(encoded)
+            offsets.append(size)
+        return cls(b"".join(chunks), offsets)
+
+    @property
+    def base(self):
+        """
+        Number of strings stored in the blob.
+        """
+        return len(self.offsets) - 1
+
+    def __len__(self):
+        return len(self.offsets) - 1 + len(self.appended)
+
+    def __getitem__(self, i):
+        if i >= len(self.offsets) - 1:
+            return self.appended[i - len(self.offsets) + 1]
+        return str(self.blob[self.offsets[i]:self.offsets[i + 1]], "utf-8")
+
+    def append(self, string):
+        self.appended.append(string)
+
+
+class Graph():
+    """
+    People and movies with their star relation in CSR form.
+    """
+
+    def __init__(self, person_ids, person_names, person_births,
+                 movie_ids, movie_titles, movie_years,
+                 person_offsets, person_movies,
+                 movie_offsets, movie_people, name_order):
+        self.person_ids = person_ids
+        self.person_names = person_names
+        self.person_births = person_births
+        self.movie_ids = movie_ids
+        self.movie_titles = movie_titles
+        self.movie_years = movie_years
+        self.person_offsets = person_offsets
+        self.person_movies = person_movies
+        self.movie_offsets = movie_offsets
+        self.movie_people = movie_people
+        self.name_order = name_order
+
+        # Number of people expanded by the most recent search
+        self.num_explored = 0
+
+        # Indices of people and movies added after the graph was built,
+        # by IMDB id, and of added people by lowercase name
+        self.added_people = {}
+        self.added_movies = {}
+        self.added_names = {}
+
+        # Stars added after the graph was built, in both directions
+        self.added_person_movies = {}
+        self.added_movie_people = {}
+
+        # Number of people, movies and stars added after the graph was built
+        self.revision = 0
+
+    @classmethod
+    def build(cls, people, movies, stars):
+        """
+        Builds a graph from iterables of (id, name, birth) people,
+        (id, title, year) movies and (person_id, movie_id) stars.
+        Stars referring to unknown people or movies are ignored,
+        as are repeated stars.
+        """
+        people = sorted(people)
+        movies = sorted(movies)
+        person_index = {row[0]: i for i, row in enumerate(people)}
+        movie_index = {row[0]: i for i, row in enumerate(movies)}
+
+        # Arestas validas, como duas listas paralelas de indices
+        edge_people = array(INDEX_TYPE)
+        edge_movies = array(INDEX_TYPE)
+        for person_id, movie_id in stars:
+            person = person_index.get(person_id)
+            movie = movie_index.get(movie_id)
+            if person is not None and movie is not None:
+                edge_people.append(person)
+                edge_movies.append(movie)
+        del person_index, movie_index
+
+        person_offsets, person_movies = _csr(
+            len(people), edge_people, edge_movies
+        )
+        del edge_people, edge_movies
+
+        # A relacao inversa e construida a partir da direta, ja sem repeticoes
+        edge_people = array(INDEX_TYPE)
+        for person in range(len(people)):
+            edge_people.extend(
+                [person] * (person_offsets[person + 1] - person_offsets[person])
+            )
+        movie_offsets, movie_people = _csr(
+            len(movies), person_movies, edge_people
+        )
+        del edge_people
+
+        name_order = array(INDEX_TYPE, sorted(
+            range(len(people)), key=lambda i: people[i][1].lower()
+        ))
+
+        return cls(
+            StringTable.from_strings(row[0] for row in people),
+            StringTable.from_strings(row[1] for row in people),
+            StringTable.from_strings(row[2] for row in people),
+            StringTable.from_strings(row[0] for row in movies),
+            StringTable.from_strings(row[1] for row in movies),
+            StringTable.from_strings(row[2] for row in movies),
+            person_offsets, person_movies,
+            movie_offsets, movie_people, name_order
+        )
+
+    @classmethod
+    def from_dicts(cls, people, movies):
+        """
+        Builds a graph from the people and movies dictionaries
+        filled by degrees.load_data.
+        """
+        return cls.build(
+            ((person_id, person["name"], person["birth"])
+             for person_id, person in people.items()),
+            ((movie_id, movie["title"], movie["year"])
+             for movie_id, movie in movies.items()),
+            ((person_id, movie_id)
+             for person_id, person in people.items()
+             for movie_id in person["movies"])
+        )
+
+    @property
+    def num_people(self):
+        return len(self.person_offsets) - 1 + len(self.added_people)
+
+    @property
+    def num_movies(self):
+        return len(self.movie_offsets) - 1 + len(self.added_movies)
+
+    def person_index(self, person_id):
+        """
+        Returns the index of a person's IMDB id, or None if unknown.
+        """
+        index = _find(self.person_ids, person_id)
+        if index is None:
+            return self.added_people.get(person_id)
+        return index
+
+    def movie_index(self, movie_id):
+        """
+        Returns the index of a movie's IMDB id, or None if unknown.
+        """
+        index = _find(self.movie_ids, movie_id)
+        if index is None:
+            return self.added_movies.get(movie_id)
+        return index
+
+    def add_person(self, person_id, name, birth):
+        """
+        Adds a person with no movies and returns their index.
+        """
+        if self.person_index(person_id) is not None:
+            raise ValueError(f"person {person_id} already exists")
+        person = self.num_people
+        self.person_ids.append(person_id)
+        self.person_names.append(name)
+        self.person_births.append(birth)
+        self.added_people[person_id] = person
+        self.added_names.setdefault(name.lower(), []).append(person)
+        self.revision += 1
+        return person
+
+    def add_movie(self, movie_id, title, year):
+        """
+        Adds a movie with no stars and returns its index.
+        """
+        if self.movie_index(movie_id) is not None:
+            raise ValueError(f"movie {movie_id} already exists")
+        movie = self.num_movies
+        self.movie_ids.append(movie_id)
+        self.movie_titles.append(title)
+        self.movie_years.append(year)
+        self.added_movies[movie_id] = movie
+        self.revision += 1
+        return movie
+
+    def add_star(self, person, movie):
+        """
+        Records that a person (by index) starred in a movie (by index).
+        Returns False if that was already known, True otherwise.
+        """
+        if not 0 <= person < self.num_people or not 0 <= movie < self.num_movies:
+            raise IndexError("no such person or movie")
+        if movie in self.movies_for_person(person):
+            return False
+        self.added_person_movies.setdefault(person, []).append(movie)
+        self.added_movie_people.setdefault(movie, []).append(person)
+        self.revision += 1
+        return True
+
+    def people_named(self, name):
+        """
+        Returns the indices of all people whose lowercase name is name.
+        """
+        names = self.person_names
+        order = self.name_order
+        low, high = 0, len(order)
+        while low < high:
+            middle = (low + high) // 2
+            if names[order[middle]].lower() < name:
+                low = middle + 1
+            else:
+                high = middle
+        matches = []
+        while low < len(order) and names[order[low]].lower() == name:
+            matches.append(order[low])
+            low += 1
+        return matches + self.added_names.get(name, [])
+
+    def movies_for_person(self, person):
+        """
+        Returns the indices of the movies a person starred in.
+        """
+        movies = ()
+        if person < len(self.person_offsets) - 1:
+            movies = self.person_movies[
+                self.person_offsets[person]:self.person_offsets[person + 1]
+            ]
+        added = self.added_person_movies.get(person)
+        if added:
+            return list(movies) + added
+        return movies
+
+    def stars_for_movie(self, movie):
+        """
+        Returns the indices of the people who starred in a movie.
+        """
+        people = ()
+        if movie < len(self.movie_offsets) - 1:
+            people = self.movie_people[
+                self.movie_offsets[movie]:self.movie_offsets[movie + 1]
+            ]
+        added = self.added_movie_people.get(movie)
+        if added:
+            return list(people) + added
+        return people
+
+    def degree(self, person):
+        """
+        Returns the number of co-stars of a person, counted with
+        repetition (once per movie they share).
+        """
+        return sum(len(self.stars_for_movie(movie))
+                   for movie in self.movies_for_person(person))
+
+    def neighbors(self, person):
+        """
+        Returns (movie, person) index pairs for people
+        who starred with a given person.
+        """
+        neighbors = set()
+        for movie in self.movies_for_person(person):
+            for other in self.stars_for_movie(movie):
+                neighbors.add((movie, other))
+        return neighbors
+
+    def shortest_path(self, source, target):
+        """
+        Returns the shortest list of (movie, person) index pairs
+        that connect the source to the target, or None if there is none.
+        """
+        return self.shortest_paths(source, [target])[target]
+
+    def shortest_paths(self, source, targets):
+        """
+        Returns a dictionary mapping each of the targets to its shortest
+        list of (movie, person) index pairs from the source (or None),
+        using a single breadth-first search tree rooted at the source.
+        """
+        parent, via = self.search_tree(source, targets)
+        return {target: self._path(parent, via, target)
+                for target in targets}
+
+    def search_tree(self, source, targets=None):
+        """
+        Runs a breadth-first search from the source and returns the
+        (parent, via) arrays of its search tree: for each person reached,
+        the person and the movie through which it was reached (-1 for
+        people not reached). The search stops as soon as every one of the
+        targets has been reached; with no targets, it covers the whole
+        connected component of the source.
+        """
+        # Para cada pessoa, a pessoa e o filme por onde foi alcancada
+        # (-1 enquanto nao foi alcancada)
+        parent = array(INDEX_TYPE, [-1]) * self.num_people
+        via = array(INDEX_TYPE, [-1]) * self.num_people
+        parent[source] = source
+        self.num_explored = 0
+        explored = 0
+
+        # Alvos que ainda nao foram alcancados
+        remaining = None
+        if targets is not None:
+            remaining = set(targets)
+            remaining.discard(source)
+            if not remaining:
+                return parent, via
+
+        movies_for_person = self.movies_for_person
+        stars_for_movie = self.stars_for_movie
+
+        frontier = [source]
+        while frontier:
+            next_frontier = []
+            for person in frontier:
+                explored += 1
+                for movie in movies_for_person(person):
+                    for other in stars_for_movie(movie):
+                        if parent[other] != -1:
+                            continue
+                        parent[other] = person
+                        via[other] = movie
+                        next_frontier.append(other)
+                        if remaining is not None and other in remaining:
+                            remaining.remove(other)
+                            if not remaining:
+                                self.num_explored = explored
+                                return parent, via
+            frontier = next_frontier
+        self.num_explored = explored
+        return parent, via
+
+    def distances(self, source):
+        """
+        Returns an array with the degrees of separation between the
+        source and every person, or UNREACHED for people not connected
+        to the source.
+        """
+        distance = array(DISTANCE_TYPE, [UNREACHED]) * self.num_people
+        distance[source] = 0
+
+        movies_for_person = self.movies_for_person
+        stars_for_movie = self.stars_for_movie
+
+        frontier = [source]
+        depth = 0
+        while frontier:
+            depth += 1
+            next_frontier = []
+            for person in frontier:
+                for movie in movies_for_person(person):
+                    for other in stars_for_movie(movie):
+                        if distance[other] == UNREACHED:
+                            distance[other] = depth
+                            next_frontier.append(other)
+            frontier = next_frontier
+        return distance
+
+    def _path(self, parent, via, target):
+        if parent[target] == -1:
+            return None
+        solution = []
+        person = target
+        while parent[person] != person:
+            solution.append((via[person], person))
+            person = parent[person]
+        solution.reverse()
+        return solution
+
+
+def _csr(size, rows, columns):
+    """
+    Groups the (rows[k], columns[k]) pairs by row, dropping repeated
+    pairs, and returns the (offsets, values) arrays of the result.
+    """
+    counts = array(OFFSET_TYPE, [0]) * (size + 1)
+    for row in rows:
+        counts[row + 1] += 1
+    for row in range(size):
+        counts[row + 1] += counts[row]
+
+    values = array(INDEX_TYPE, [0]) * len(rows)
+    position = array(OFFSET_TYPE, counts[:-1])
+    for row, column in zip(rows, columns):
+        values[position[row]] = column
+        position[row] += 1
+    del position
+
+    # Ordena cada linha e remove repeticoes, compactando no lugar
+    offsets = array(OFFSET_TYPE, [0]) * (size + 1)
+    end = 0
+    for row in range(size):
+        segment = sorted(set(values[counts[row]:counts[row + 1]]))
+        values[end:end + len(segment)] = array(INDEX_TYPE, segment)
+        end += len(segment)
+        offsets[row + 1] = end
+    del values[end:]
+    return offsets, values
+
+
+def _find(table, key):
+    """
+    Binary search for key among the sorted strings
+    in the blob of a StringTable.
+    """
+    low, high = 0, table.base
+    while low < high:
+        middle = (low + high) // 2
+        if table[middle] < key:
+            low = middle + 1
+        else:
+            high = middle
+    if low < table.base and table[low] == key:
+        return low
+    return None
+
+
+class PeopleView(Mapping):
+    """
+    Read-only view of a graph with the same shape as degrees.people:
+    person_id -> {"name", "birth", "movies"}.
+    """
+
+    def __init__(self, graph):
+        self.graph = graph
+
+    def __getitem__(self, person_id):
+        graph = self.graph
+        person = graph.person_index(person_id)
+        if person is None:
+            raise KeyError(person_id)
+        return {
+            "name": graph.person_names[person],
+            "birth": graph.person_births[person],
+            "movies": {graph.movie_ids[movie]
+                       for movie in graph.movies_for_person(person)}
+        }
+
+    def __contains__(self, person_id):
+        return self.graph.person_index(person_id) is not None
+
+    def __iter__(self):
+        ids = self.graph.person_ids
+        return (ids[i] for i in range(len(ids)))
+
+    def __len__(self):
+        return self.graph.num_people
+
+
+class MoviesView(Mapping):
+    """
+    Read-only view of a graph with the same shape as degrees.movies:
+    movie_id -> {"title", "year", "stars"}.
+    """
+
+    def __init__(self, graph):
+        self.graph = graph
+
+    def __getitem__(self, movie_id):
+        graph = self.graph
+        movie = graph.movie_index(movie_id)
+        if movie is None:
+            raise KeyError(movie_id)
+        return {
+            "title": graph.movie_titles[movie],
+            "year": graph.movie_years[movie],
+            "stars": {graph.person_ids[person]
+                      for person in graph.stars_for_movie(movie)}
+        }
+
+    def __contains__(self, movie_id):
+        return self.graph.movie_index(movie_id) is not None
+
+    def __iter__(self):
+        ids = self.graph.movie_ids
+        return (ids[i] for i in range(len(ids)))
+
+    def __len__(self):
+        return self.graph.num_movies
+
+
+class NamesView(Mapping):
+    """
+    Read-only view of a graph with the same shape as degrees.names:
+    lowercase name -> set of person_ids.
+    """
+
+    def __init__(self, graph):
+        self.graph = graph
+
+    def __getitem__(self, name):
+        people = self.graph.people_named(name)
+        if not people:
+            raise KeyError(name)
+        return {self.graph.person_ids[person] for person in people}
+
+    def __contains__(self, name):
+        return bool(self.graph.people_named(name))
+
+    def __iter__(self):
+        names = self.graph.person_names
+        previous = None
+        for person in self.graph.name_order:
+            name = names[person].lower()
+            if name != previous:
+                yield name
+                previous = name
+        # Nomes que so aparecem entre as pessoas adicionadas
+        for name, added in self.graph.added_names.items():
+            if len(self.graph.people_named(name)) == len(added):
+                yield name
+
+    def __len__(self):
+        return sum(1 for _ in self)
@@ -0,0 +1,287 @@
+"""
+Landmark-based distance oracle for degrees of separation.
+
+Usage: python landmarks.py directory [k]
+
+Precomputes the degrees of separation between k landmark people (the
+ones with the most co-stars) and everyone else, and saves them next to
+the data. By the triangle inequality, for any landmark L,
+
+    |d(s, L) - d(t, L)| <= d(s, t) <= d(s, L) + d(L, t)
+
+so the saved distances bound the separation of any pair in constant
+time per landmark, and the lower bound guides an exact A* search.
+
+When people and stars are added to the graph, the distances are repaired
+in place: an added star can only bring people closer to a landmark, so a
+breadth-first search from the people it brings closer updates exactly
+the distances that changed. The same repair brings an oracle saved
+before later changes up to date as degrees replays them from the
+snapshot's journal.
+"""
+
+import heapq
+import json
+import math
+import struct
+import sys
+from array import array
+
+import degrees
+import snapshot
+from graph import DISTANCE_TYPE, INDEX_TYPE, UNREACHED
+
+MAGIC = b"DEGLMK\0\0"
+VERSION = 3
+
+# Name of the landmarks file inside a data directory
+LANDMARKS_NAME = "degrees.landmarks"
+
+HEADER = struct.Struct("<8sII")
+
+
+class LandmarkOracle():
+    """
+    Distances from a set of landmark people to every person of a Graph.
+    """
+
+    def __init__(self, graph, landmarks, distances):
+        self.graph = graph
+        self.landmarks = landmarks
+        self.distances = distances
+
+    @classmethod
+    def build(cls, graph, k):
+        """
+        Runs a breadth-first search from each of the k people
+        with the most co-stars.
+        """
+        landmarks = heapq.nlargest(k, range(graph.num_people), key=graph.degree)
+        return cls(
+            graph,
+            array(INDEX_TYPE, landmarks),
+            [graph.distances(landmark) for landmark in landmarks]
+        )
+
+    def save(self, path, key):
+        """
+        Writes the distances to path, tagged with key
+        (see snapshot.source_key) and the graph's size and revision.
+        """
+        header = json.dumps({"key": key, "k": len(self.landmarks),
+                             "size": self.graph.num_people,
+                             "revision": self.graph.revision}).encode("utf-8")
+        with open(path, "wb") as f:
+            f.write(HEADER.pack(MAGIC, VERSION, len(header)))
+            f.write(header)
+            self.landmarks.tofile(f)
+            for distance in self.distances:
+                distance.tofile(f)
+
+    @classmethod
+    def load(cls, path, graph, key):
+        """
+        Loads the oracle saved at path for graph, or returns None if
+        there is none, it was saved for other source files than those
+        identified by key, or for a graph of another size, or before
+        or after other changes to it.
+        """
+        try:
+            with open(path, "rb") as f:
+                header = _read_header(f, key)
+                if (header is None or header["size"] != graph.num_people
+                        or header["revision"] != graph.revision):
+                    return None
+                k, size = header["k"], header["size"]
+                landmarks = array(INDEX_TYPE)
+                landmarks.fromfile(f, k)
+                distances = []
+                for _ in range(k):
+                    distance = array(DISTANCE_TYPE)
+                    distance.fromfile(f, size)
+                    distances.append(distance)
+        except (OSError, EOFError, ValueError, KeyError, struct.error):
+            return None
+        return cls(graph, landmarks, distances)
+
+    def add_person(self, person):
+        """
+        Records that a person was added to the graph, unreached
+        by any landmark until they star in a movie.
+        """
+        for distance in self.distances:
+            while len(distance) <= person:
+                distance.append(UNREACHED)
+
+    def add_star(self, movie):
+        """
+        Repairs the distances after someone was added to the stars
+        of a movie (by index), connecting them to the rest of its cast.
+        """
+        graph = self.graph
+        cast = graph.stars_for_movie(movie)
+        for distance in self.distances:
+            reached = [distance[other] for other in cast if distance[other] != UNREACHED]
+            if not reached:
+                continue
+
+            # Todo o elenco fica a no maximo um passo do mais proximo
+            depth = min(reached) + 1
+            frontier = [other for other in cast
+                        if distance[other] == UNREACHED or distance[other] > depth]
+            for other in frontier:
+                distance[other] = depth
+
+            # Propaga a melhora enquanto ela encurtar alguma distancia
+            while frontier:
+                depth += 1
+                next_frontier = []
+                for current in frontier:
+                    for shared in graph.movies_for_person(current):
+                        for other in graph.stars_for_movie(shared):
+                            if distance[other] == UNREACHED or distance[other] > depth:
+                                distance[other] = depth
+                                next_frontier.append(other)
+                frontier = next_frontier
+
+    def bounds(self, source, target):
+        """
+        Returns (lower, upper) bounds on the degrees of separation
+        between two people given by index. If some landmark proves they
+        are not connected, both are math.inf; if no landmark reaches
+        both, upper is math.inf.
+        """
+        if source == target:
+            return 0, 0
+        lower = 1
+        upper = math.inf
+        for distance in self.distances:
+            to_source = distance[source]
+            to_target = distance[target]
+            if to_source == UNREACHED and to_target == UNREACHED:
+                continue
+            if to_source == UNREACHED or to_target == UNREACHED:
+                return math.inf, math.inf
+            lower = max(lower, abs(to_source - to_target))
+            upper = min(upper, to_source + to_target)
+        return lower, upper
+
+    def estimate(self, source, target):
+        """
+        Returns (lower, upper) bounds on the degrees of separation
+        between two people given by IMDB id.
+        """
+        return self.bounds(self.graph.person_index(source),
+                           self.graph.person_index(target))
+
+    def shortest_path(self, source, target):
+        """
+        Returns the shortest list of (movie, person) index pairs that
+        connect the source to the target, or None if there is none,
+        using an A* search guided by the landmark lower bounds.
+        """
+        lower, upper = self.bounds(source, target)
+        if lower == math.inf:
+            return None
+        if source == target:
+            return []
+
+        graph = self.graph
+        cost = {source: 0}
+        parent = {source: None}
+
+        # Fila de prioridade por custo estimado; em empates, prefere
+        # os nos mais profundos, que estao mais perto do alvo
+        queue = [(lower, 0, source)]
+        while queue:
+            _, depth, person = heapq.heappop(queue)
+            depth = -depth
+            if person == target:
+                return _path(parent, target)
+            if depth > cost[person]:
+                continue
+            for movie in graph.movies_for_person(person):
+                for other in graph.stars_for_movie(movie):
+                    if depth + 1 >= cost.get(other, math.inf):
+                        continue
+                    estimate = depth + 1 + self._lower(other, target)
+                    # Nenhum caminho por aqui chega ao alvo dentro do limite
+                    if estimate > upper or estimate == math.inf:
+                        continue
+                    cost[other] = depth + 1
+                    parent[other] = (movie, person)
+                    heapq.heappush(queue, (estimate, -(depth + 1), other))
+        return None
+
+    def _lower(self, person, target):
+        """
+        Lower bound on the distance between two people, as a heuristic:
+        0 if nothing is known, math.inf if they are not connected.
+        """
+        lower = 0
+        for distance in self.distances:
+            to_person = distance[person]
+            to_target = distance[target]
+            if (to_person == UNREACHED) != (to_target == UNREACHED):
+                return math.inf
+            if to_person != UNREACHED:
+                lower = max(lower, abs(to_person - to_target))
+        return lower
+
+
+def saved_revision(path, key):
+    """
+    Returns the revision of the graph the oracle at path was saved for,
+    or None if there is no valid oracle there for the source files
+    identified by key.
+    """
+    try:
+        with open(path, "rb") as f:
+            header = _read_header(f, key)
+        return None if header is None else header["revision"]
+    except (OSError, ValueError, KeyError, struct.error):
+        return None
+
+
+def _read_header(f, key):
+    """
+    Reads the header of an oracle file, returning None if it is not
+    one or was saved for other source files than those identified by key.
+    """
+    magic, version, size = HEADER.unpack(f.read(HEADER.size))
+    if magic != MAGIC or version != VERSION:
+        return None
+    header = json.loads(f.read(size))
+    if header["key"] != key:
+        return None
+    return header
+
+
+def _path(parent, target):
+    solution = []
+    person = target
+    while parent[person] is not None:
+        movie, previous = parent[person]
+        solution.append((movie, person))
+        person = previous
+    solution.reverse()
+    return solution
+
+
+def main():
+    if len(sys.argv) not in (2, 3):
+        sys.exit("Usage: python landmarks.py directory [k]")
+    directory = sys.argv[1]
+    k = int(sys.argv[2]) if len(sys.argv) == 3 else 16
+
+    print("Loading data...")
+    degrees.load_data(directory, compact=True)
+    print(f"Computing distances from {k} landmarks...")
+    oracle = LandmarkOracle.build(degrees.graph, k)
+    oracle.save(f"{directory}/{LANDMARKS_NAME}",
+                snapshot.source_key(degrees.data_files(directory)))
+    print("Landmarks saved.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,411 @@
+"""
+Search index over people's names, for prefix and fuzzy lookups.
+
+Names are kept in lowercase sorted order, so all names starting with a
+prefix are a contiguous run found by binary search. Fuzzy lookups use an
+inverted index from each trigram (three consecutive characters of the
+padded name) to the positions of the names containing it: each edit
+destroys at most three trigrams, so a name within edit distance d of the
+query shares all but at most 3d of the query's trigrams, and only names
+that do are compared with the query.
+
+Queries short enough that every name within distance d of them is short
+(as are all queries too short to keep any trigram after d edits) use a
+second index instead, from each string obtained by deleting up to
+SHORT_DELETIONS characters of a short name to the names it comes from:
+two strings within edit distance d become equal after at most d
+deletions in each, so a name within d of the query shares one of those
+strings with it.
+
+People added after the index is built are kept in a separate small
+sorted list, searched alongside the main index.
+"""
+
+import bisect
+import heapq
+import json
+import struct
+from array import array
+from collections import Counter
+
+from graph import INDEX_TYPE
+
+MAGIC = b"DEGNAME\0"
+VERSION = 2
+
+# Name of the saved trigram index inside a data directory
+NAMES_NAME = "degrees.names"
+
+HEADER = struct.Struct("<8sII")
+
+# Trigrams counted by fuzzy search beyond the minimum needed to find every
+# match; each one raises the count a name needs to be compared with the query
+RARE_EXTRA = 2
+
+# Letras apagadas dos nomes curtos no indice de delecoes; os nomes com
+# ate SHORT_LENGTH letras cobrem, com a distancia d, toda consulta que
+# pode perder todos os trigramas (com ate 3d - 1 letras)
+SHORT_DELETIONS = 2
+SHORT_LENGTH = 4 * SHORT_DELETIONS - 1
+
+
+class NameIndex():
+    """
+    Sorted lowercase names, with the person_id and birth of each,
+    and the fuzzy search indexes, built by prepare or on first use.
+    """
+
+    def __init__(self, keys, person_ids, names, births):
+        self.keys = keys
+        self.person_ids = person_ids
+        self.names = names
+        self.births = births
+        self.trigrams = None
+
+        # Posicoes dos nomes curtos e o indice das suas delecoes
+        self.short = None
+        self.deletions = None
+
+        # Sorted (key, person_id, name, birth) of the people added since
+        self.added = []
+
+    @classmethod
+    def build(cls, people):
+        """
+        Builds an index from (person_id, name, birth) tuples.
+        """
+        entries = sorted((name.lower(), person_id, name, birth)
+                         for person_id, name, birth in people)
+        return cls(
+            [entry[0] for entry in entries],
+            [entry[1] for entry in entries],
+            [entry[2] for entry in entries],
+            [entry[3] for entry in entries]
+        )
+
+    @classmethod
+    def from_graph(cls, graph):
+        """
+        Returns an index over a Graph's people, reading the names in
+        the order given by its name_order array instead of copying them.
+        """
+        order = graph.name_order
+        index = cls(
+            _Ordered(graph.person_names, order, str.lower),
+            _Ordered(graph.person_ids, order),
+            _Ordered(graph.person_names, order),
+            _Ordered(graph.person_births, order)
+        )
+        for person in range(len(order), graph.num_people):
+            index.add(graph.person_ids[person], graph.person_names[person],
+                      graph.person_births[person])
+        return index
+
+    def __len__(self):
+        return len(self.keys) + len(self.added)
+
+    def add(self, person_id, name, birth):
+        """
+        Adds a person to the index.
+        """
+        bisect.insort(self.added, (name.lower(), person_id, name, birth))
+
+    def entry(self, position):
+        """
+        Returns the (person_id, name, birth) of the name at a position.
+        """
+        return (self.person_ids[position], self.names[position],
+                self.births[position])
+
+    def prepare(self):
+        """
+        Builds the indexes used by fuzzy search, unless they were
+        already built or loaded.
+        """
+        if self.trigrams is None:
+            self.trigrams = _build_trigrams(self.keys)
+        if self.short is None:
+            self.short = array(INDEX_TYPE, (
+                position for position in range(len(self.keys))
+                if len(self.keys[position]) <= SHORT_LENGTH
+            ))
+        if self.deletions is None:
+            self.deletions = _build_deletions(self.keys, self.short)
+
+    def lookup(self, name, birth=None):
+        """
+        Returns the person_ids of everyone named name (in any case),
+        born in the given year if birth is not None.
+        """
+        key = name.lower()
+        person_ids = []
+        position = self._bisect(key)
+        while position < len(self.keys) and self.keys[position] == key:
+            if birth is None or self.births[position] == str(birth):
+                person_ids.append(self.person_ids[position])
+            position += 1
+        position = bisect.bisect_left(self.added, (key,))
+        while position < len(self.added) and self.added[position][0] == key:
+            if birth is None or self.added[position][3] == str(birth):
+                person_ids.append(self.added[position][1])
+            position += 1
+        return person_ids
+
+    def prefix(self, prefix, limit=10):
+        """
+        Returns up to limit (person_id, name, birth) entries whose name
+        starts with prefix, in alphabetical order (so an exact match,
+        if any, comes first).
+        """
+        key = prefix.lower()
+        matches = []
+        position = self._bisect(key)
+        while (len(matches) < limit and position < len(self.keys)
+               and self.keys[position].startswith(key)):
+            matches.append((self.keys[position], *self.entry(position)))
+            position += 1
+
+        # Intercala os nomes adicionados que tambem comecam com o prefixo
+        position = bisect.bisect_left(self.added, (key,))
+        added = []
+        while (len(added) < limit and position < len(self.added)
+               and self.added[position][0].startswith(key)):
+            added.append(self.added[position])
+            position += 1
+        return [match[1:] for match in heapq.merge(matches, added)][:limit]
+
+    def fuzzy(self, query, limit=10, max_distance=2):
+        """
+        Returns up to limit (person_id, name, birth) entries whose name
+        is within max_distance edits of query, closest first.
+        """
+        self.prepare()
+
+        # Tenta primeiro as distancias menores, que filtram muito mais nomes
+        key = query.lower()
+        for distance in range(1, max_distance + 1):
+            matches = self._within(key, distance)
+            if len(matches) >= limit:
+                break
+        return [entry for _, _, entry in matches[:limit]]
+
+    def _within(self, key, max_distance):
+        """
+        Returns sorted (distance, key, entry) tuples for every name
+        within max_distance edits of key.
+        """
+        # Os nomes dentro da distancia de uma consulta curta sao todos
+        # curtos, e o indice de delecoes acha exatamente esses
+        if max_distance <= SHORT_DELETIONS and len(key) + max_distance <= SHORT_LENGTH:
+            positions = set()
+            for variant in _deletions(key, max_distance):
+                positions.update(self.deletions.get(variant, ()))
+        else:
+            # Um nome dentro da distancia perde no maximo 3d trigramas da
+            # consulta, logo contem ao menos r - 3d de quaisquer r deles:
+            # basta contar os r trigramas mais raros
+            grams = sorted(set(_trigrams(key)),
+                           key=lambda gram: len(self.trigrams.get(gram, ())))
+            grams = grams[:3 * max_distance + RARE_EXTRA + 1]
+            threshold = len(grams) - 3 * max_distance
+
+            # Consultas com trigramas repetidos podem perder todos eles:
+            # sem filtro, compara todos os nomes de tamanho proximo
+            if threshold <= 0:
+                positions = range(len(self.keys))
+            else:
+                counts = Counter()
+                for gram in grams:
+                    counts.update(self.trigrams.get(gram, ()))
+                positions = [position for position, count in counts.items()
+                             if count >= threshold]
+
+        matches = []
+        for position in positions:
+            candidate = self.keys[position]
+            if abs(len(candidate) - len(key)) > max_distance:
+                continue
+            distance = edit_distance(key, candidate)
+            if distance <= max_distance:
+                matches.append((distance, candidate, self.entry(position)))
+
+        # Os nomes adicionados sao poucos e comparados um a um
+        for candidate, *entry in self.added:
+            if abs(len(candidate) - len(key)) > max_distance:
+                continue
+            distance = edit_distance(key, candidate)
+            if distance <= max_distance:
+                matches.append((distance, candidate, tuple(entry)))
+        matches.sort()
+        return matches
+
+    def search(self, query, limit=10, max_distance=2):
+        """
+        Returns up to limit (person_id, name, birth) entries matching
+        query: names starting with it first, then fuzzy matches.
+        """
+        matches = self.prefix(query, limit)
+        if len(matches) < limit:
+            seen = {match[0] for match in matches}
+            for match in self.fuzzy(query, limit, max_distance):
+                if match[0] not in seen and len(matches) < limit:
+                    matches.append(match)
+        return matches
+
+    def save(self, path, key):
+        """
+        Writes the trigram index to path, tagged with key
+        (see snapshot.source_key).
+        """
+        self.prepare()
+        layout = {}
+        postings = array(INDEX_TYPE)
+        for gram, positions in self.trigrams.items():
+            layout[gram] = [len(postings), len(positions)]
+            postings.extend(positions)
+        header = json.dumps({"key": key, "size": len(self.keys), "trigrams": layout,
+                             "short": self.short.tolist()})
+        header = header.encode("utf-8")
+        with open(path, "wb") as f:
+            f.write(HEADER.pack(MAGIC, VERSION, len(header)))
+            f.write(header)
+            postings.tofile(f)
+
+    def load(self, path, key):
+        """
+        Loads the trigram index saved at path, if it was saved with key
+        for an index of the same size. Returns whether it was loaded.
+        """
+        try:
+            with open(path, "rb") as f:
+                magic, version, size = HEADER.unpack(f.read(HEADER.size))
+                if magic != MAGIC or version != VERSION:
+                    return False
+                header = json.loads(f.read(size))
+                if header["key"] != key or header["size"] != len(self.keys):
+                    return False
+                postings = array(INDEX_TYPE)
+                postings.fromfile(f, sum(length for _, length
+                                         in header["trigrams"].values()))
+        except (OSError, EOFError, ValueError, struct.error):
+            return False
+        view = memoryview(postings)
+        self.trigrams = {gram: view[start:start + length]
+                         for gram, (start, length) in header["trigrams"].items()}
+        self.short = array(INDEX_TYPE, header["short"])
+        self.deletions = None
+        return True
+
+    def _bisect(self, key):
+        low, high = 0, len(self.keys)
+        while low < high:
+            middle = (low + high) // 2
+            if self.keys[middle] < key:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+
+class _Ordered():
+    """
+    Sequence view of a table in the order given by an array
+    of positions, optionally transformed by a function.
+    """
+
+    def __init__(self, table, order, function=None):
+        self.table = table
+        self.order = order
+        self.function = function
+
+    def __len__(self):
+        return len(self.order)
+
+    def __getitem__(self, i):
+        value = self.table[self.order[i]]
+        if self.function is not None:
+            return self.function(value)
+        return value
+
+
+def _trigrams(key):
+    padded = f"  {key} "
+    return [padded[i:i + 3] for i in range(len(padded) - 2)]
+
+
+def _build_trigrams(keys):
+    """
+    Maps each trigram to an array of the positions of the keys containing it.
+    """
+    trigrams = {}
+    for position in range(len(keys)):
+        for gram in set(_trigrams(keys[position])):
+            postings = trigrams.get(gram)
+            if postings is None:
+                postings = trigrams[gram] = array(INDEX_TYPE)
+            postings.append(position)
+    return trigrams
+
+
+def _deletions(key, count):
+    """
+    Returns the set of strings obtained by deleting
+    up to count characters of key.
+    """
+    variants = {key}
+    frontier = {key}
+    for _ in range(count):
+        frontier = {word[:i] + word[i + 1:] for word in frontier for i in range(len(word))}
+        variants |= frontier
+    return variants
+
+
+def _build_deletions(keys, positions):
+    """
+    Maps each string obtained by deleting up to SHORT_DELETIONS characters
+    of the keys at positions to an array of the positions it comes from.
+    """
+    deletions = {}
+    for position in positions:
+        for variant in _deletions(keys[position], SHORT_DELETIONS):
+            postings = deletions.get(variant)
+            if postings is None:
+                postings = deletions[variant] = array(INDEX_TYPE)
+            postings.append(position)
+    return deletions
+
+
+def edit_distance(a, b):
+    """
+    Returns the Levenshtein distance between a and b, computed with
+    Myers' bit-parallel algorithm: each column of the dynamic programming
+    table is encoded in the bits of a few integers.
+    """
+    if not a:
+        return len(b)
+
+    # Mascara com os bits das posicoes de cada caractere de a
+    positions = {}
+    for i, c in enumerate(a):
+        positions[c] = positions.get(c, 0) | (1 << i)
+
+    mask = (1 << len(a)) - 1
+    last = 1 << (len(a) - 1)
+    vertical_plus = mask
+    vertical_minus = 0
+    score = len(a)
+    for c in b:
+        equal = positions.get(c, 0)
+        x_vertical = equal | vertical_minus
+        x_horizontal = (((equal & vertical_plus) + vertical_plus) ^ vertical_plus) | equal
+        horizontal_plus = vertical_minus | (~(x_horizontal | vertical_plus) & mask)
+        horizontal_minus = vertical_plus & x_horizontal
+        if horizontal_plus & last:
+            score += 1
+        elif horizontal_minus & last:
+            score -= 1
+        horizontal_plus = ((horizontal_plus << 1) | 1) & mask
+        horizontal_minus = (horizontal_minus << 1) & mask
+        vertical_plus = horizontal_minus | (~(x_vertical | horizontal_plus) & mask)
+        vertical_minus = horizontal_plus & x_vertical
+    return score
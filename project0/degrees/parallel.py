@@ -0,0 +1,88 @@
+"""
+Runs batches of degrees queries on a pool of worker processes.
+
+Workers are forked after the data is loaded, so they share the parent's
+graph instead of receiving a copy. With the compact graph (and especially
+with a memory-mapped snapshot) the shared data lives in a handful of large
+arrays that are never written to, so its pages are never copied; with the
+dictionary representation, reference count updates cause the pages that
+are touched to be copied on write.
+"""
+
+import gc
+import multiprocessing
+import os
+import time
+
+import degrees
+
+
+def parallel_shortest_paths(pairs, processes=None, stats=None):
+    """
+    Yields (source, target, path) for each (source, target) pair, like
+    degrees.batch_shortest_paths, but answers each source's group of
+    targets on one of a pool of processes (os.cpu_count() by default).
+    Results are yielded as each group finishes.
+
+    If stats is a dictionary, it is filled with the number of sources,
+    queries and seconds spent searching by each worker, keyed by pid.
+    """
+    groups = degrees.group_by_source(pairs)
+
+    # Sem fork nao ha como compartilhar o grafo: responde no processo atual
+    if "fork" not in multiprocessing.get_all_start_methods():
+        for source, targets in groups.items():
+            yield from _answer(source, targets, stats)
+        return
+
+    # Objetos ja carregados nao sao mais visitados pelo coletor de lixo,
+    # evitando que os workers copiem as paginas ao examina-los
+    gc.freeze()
+    context = multiprocessing.get_context("fork")
+    processes = processes or os.cpu_count()
+    chunksize = max(1, len(groups) // (processes * 4))
+    try:
+        with context.Pool(processes) as pool:
+            for pid, source, targets, paths, elapsed in pool.imap_unordered(
+                _search, groups.items(), chunksize
+            ):
+                if stats is not None:
+                    _record(stats, pid, len(targets), elapsed)
+                for target in targets:
+                    yield source, target, paths[target]
+    finally:
+        gc.unfreeze()
+
+
+def throughput(stats):
+    """
+    Returns a dictionary mapping each worker's pid to its
+    throughput in queries per second.
+    """
+    return {pid: worker["queries"] / worker["seconds"] if worker["seconds"] else 0.0
+            for pid, worker in stats.items()}
+
+
+def _search(group):
+    """
+    Answers one source's targets inside a worker process.
+    """
+    source, targets = group
+    start = time.perf_counter()
+    paths = degrees.shortest_paths(source, targets)
+    return os.getpid(), source, targets, paths, time.perf_counter() - start
+
+
+def _answer(source, targets, stats):
+    _, _, _, paths, elapsed = _search((source, targets))
+    if stats is not None:
+        _record(stats, os.getpid(), len(targets), elapsed)
+    for target in targets:
+        yield source, target, paths[target]
+
+
+def _record(stats, pid, queries, elapsed):
+    worker = stats.setdefault(pid, {"sources": 0, "queries": 0, "seconds": 0.0})
+    worker["sources"] += 1
+    worker["queries"] += queries
+    worker["seconds"] += elapsed
@@ -0,0 +1,260 @@
+"""
+Long-running degrees of separation server.
+
+Usage: python server.py [--compact] [--host HOST] [--port PORT]
+                        [--unix PATH] [--concurrency N] [--cache-mb MB]
+                        directory
+
+Loads the data once and answers HTTP requests, over TCP or over a Unix
+socket, until interrupted:
+
+    GET /path?source=ID&target=ID       shortest path between two people
+    GET /estimate?source=ID&target=ID   bounds on their degrees of separation
+    GET /person?name=NAME[&birth=YEAR]  people with the given name
+    GET /search?q=QUERY[&limit=N]       prefix and fuzzy name search
+    GET /stats                          request latency percentiles
+
+At most N searches run at the same time; other requests wait their turn.
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs, urlsplit
+
+import degrees
+
+# Number of recent latencies kept per endpoint
+LATENCY_WINDOW = 10000
+
+STATUS_TEXT = {200: "OK", 400: "Bad Request", 404: "Not Found",
+               405: "Method Not Allowed", 500: "Internal Server Error"}
+
+
+class LatencyStats():
+    """
+    Latencies of the most recent requests to each endpoint.
+    """
+
+    def __init__(self, window=LATENCY_WINDOW):
+        self.window = window
+        self.latencies = {}
+        self.counts = {}
+
+    def add(self, endpoint, seconds):
+        if endpoint not in self.latencies:
+            self.latencies[endpoint] = deque(maxlen=self.window)
+            self.counts[endpoint] = 0
+        self.latencies[endpoint].append(seconds)
+        self.counts[endpoint] += 1
+
+    def summary(self):
+        """
+        Returns, for each endpoint, its number of requests and the
+        50th, 90th and 99th percentiles of its recent latencies in
+        milliseconds.
+        """
+        summary = {}
+        for endpoint, latencies in self.latencies.items():
+            ordered = sorted(latencies)
+            summary[endpoint] = {"requests": self.counts[endpoint]}
+            for percentile in (50, 90, 99):
+                # Percentil pelo metodo do posto mais proximo
+                rank = max(1, math.ceil(percentile / 100 * len(ordered)))
+                summary[endpoint][f"p{percentile}_ms"] = ordered[rank - 1] * 1000
+        return summary
+
+
+class Server():
+    """
+    Answers queries against the data loaded in the degrees module.
+    """
+
+    def __init__(self, concurrency):
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.executor = ThreadPoolExecutor(concurrency)
+        self.stats = LatencyStats()
+
+    async def handle(self, reader, writer):
+        try:
+            request = await reader.readline()
+            # Descarta os cabecalhos da requisicao
+            while (await reader.readline()).strip():
+                pass
+            start = time.perf_counter()
+            endpoint, status, body = await self.respond(request)
+            self.stats.add(endpoint, time.perf_counter() - start)
+            data = json.dumps(body).encode("utf-8")
+            writer.write(
+                f"HTTP/1.1 {status} {STATUS_TEXT[status]}\r\n"
+                f"Content-Type: application/json\r\n"
+                f"Content-Length: {len(data)}\r\n"
+                f"Connection: close\r\n\r\n".encode("utf-8") + data
+            )
+            await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def respond(self, request):
+        """
+        Returns the endpoint, status code and JSON body
+        answering an HTTP request line.
+        """
+        try:
+            method, target, _ = request.decode("latin-1").split()
+        except ValueError:
+            return "invalid", 400, {"error": "malformed request"}
+        url = urlsplit(target)
+        query = {key: values[0] for key, values in parse_qs(url.query).items()}
+        endpoint = url.path
+        if method != "GET":
+            return endpoint, 405, {"error": "only GET is supported"}
+
+        if endpoint == "/stats":
+            stats = {"latency": self.stats.summary()}
+            if degrees.neighbor_cache is not None:
+                stats["neighbor_cache"] = degrees.neighbor_cache.stats()
+            return endpoint, 200, stats
+        if endpoint == "/path":
+            if "source" not in query or "target" not in query:
+                return endpoint, 400, {"error": "source and target are required"}
+            return (endpoint, *await self.run(path, query["source"], query["target"]))
+        if endpoint == "/estimate":
+            if "source" not in query or "target" not in query:
+                return endpoint, 400, {"error": "source and target are required"}
+            return (endpoint, *await self.run(estimate, query["source"], query["target"]))
+        if endpoint == "/person":
+            if "name" not in query:
+                return endpoint, 400, {"error": "name is required"}
+            return (endpoint, *await self.run(person, query["name"], query.get("birth")))
+        if endpoint == "/search":
+            if "q" not in query:
+                return endpoint, 400, {"error": "q is required"}
+            try:
+                limit = int(query.get("limit", 10))
+            except ValueError:
+                return endpoint, 400, {"error": "limit must be an integer"}
+            return (endpoint, *await self.run(search, query["q"], limit))
+        return "unknown", 404, {"error": "unknown endpoint"}
+
+    async def run(self, function, *args):
+        """
+        Runs a query on the thread pool, with at most
+        `concurrency` queries running at once.
+        """
+        async with self.semaphore:
+            loop = asyncio.get_running_loop()
+            try:
+                return await loop.run_in_executor(self.executor, function, *args)
+            except Exception as exception:
+                return 500, {"error": str(exception)}
+
+
+def path(source, target):
+    """
+    Returns the status and body for a shortest path query.
+    """
+    for person_id in (source, target):
+        if person_id not in degrees.people:
+            return 404, {"error": f"unknown person {person_id}"}
+    solution = degrees.bidirectional_shortest_path(source, target)
+    return 200, {
+        "source": source,
+        "target": target,
+        "degrees": None if solution is None else len(solution),
+        "path": solution
+    }
+
+
+def estimate(source, target):
+    """
+    Returns the status and body for a degrees of separation estimate,
+    with null for an infinite bound.
+    """
+    for person_id in (source, target):
+        if person_id not in degrees.people:
+            return 404, {"error": f"unknown person {person_id}"}
+    lower, upper = degrees.estimate_degrees(source, target)
+    return 200, {
+        "source": source,
+        "target": target,
+        "lower": None if lower == math.inf else lower,
+        "upper": None if upper == math.inf else upper
+    }
+
+
+def person(name, birth=None):
+    """
+    Returns the status and body for a name lookup,
+    optionally restricted to a year of birth.
+    """
+    person_ids = sorted(degrees.get_name_index().lookup(name, birth))
+    return 200, {
+        "name": name,
+        "people": [{"id": person_id,
+                    "name": degrees.people[person_id]["name"],
+                    "birth": degrees.people[person_id]["birth"]}
+                   for person_id in person_ids]
+    }
+
+
+def search(query, limit):
+    """
+    Returns the status and body for a prefix and fuzzy name search.
+    """
+    return 200, {
+        "query": query,
+        "people": [{"id": person_id, "name": name, "birth": birth}
+                   for person_id, name, birth in degrees.search_names(query, limit)]
+    }
+
+
+async def serve(args):
+    server = Server(args.concurrency)
+    if args.unix:
+        listener = await asyncio.start_unix_server(server.handle, path=args.unix)
+        print(f"Listening on {args.unix}")
+    else:
+        listener = await asyncio.start_server(server.handle, args.host, args.port)
+        print(f"Listening on http://{args.host}:{args.port}")
+    async with listener:
+        await listener.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve degrees queries.")
+    parser.add_argument("directory")
+    parser.add_argument("--compact", action="store_true",
+                        help="load the data into a compact graph")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--unix", help="listen on a Unix socket at this path")
+    parser.add_argument("--concurrency", type=int, default=8,
+                        help="maximum number of searches running at once")
+    parser.add_argument("--cache-mb", type=int, default=64,
+                        help="size of the neighbor cache (0 to disable)")
+    args = parser.parse_args()
+
+    print("Loading data...")
+    degrees.load_data(args.directory, compact=args.compact)
+    if args.cache_mb:
+        degrees.enable_neighbor_cache(args.cache_mb * 1024 * 1024)
+
+    # Monta os indices de nomes antes de aceitar as primeiras buscas
+    degrees.get_name_index().prepare()
+    print("Data loaded.")
+
+    try:
+        asyncio.run(serve(args))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
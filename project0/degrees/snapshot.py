@@ -0,0 +1,192 @@
+"""
+Versioned binary snapshots of a compact Graph.
+
+A snapshot file is laid out as:
+
+    magic (8 bytes) | version (uint32) | header size (uint32) | header | data
+
+where the header is JSON describing the source files the snapshot was
+built from and the position of every array in the data section. Arrays
+are stored in native byte order, aligned to 8 bytes, so that a snapshot
+can be memory-mapped and used directly without being parsed.
+
+Changes made to the graph after it was loaded are appended to a journal
+next to the snapshot, one JSON record per line, and replayed on top of
+the snapshot when it is loaded again.
+"""
+
+import json
+import mmap
+import os
+import struct
+import sys
+
+from graph import Graph, StringTable
+
+MAGIC = b"DEGSNAP\0"
+VERSION = 1
+
+# Name of the snapshot file inside a data directory
+SNAPSHOT_NAME = "degrees.snapshot"
+
+# Suffix added to the snapshot's path to name its journal
+JOURNAL_SUFFIX = ".journal"
+
+PREFIX = struct.Struct("<8sII")
+ALIGNMENT = 8
+
+# Order in which the graph's attributes are written
+STRING_TABLES = ["person_ids", "person_names", "person_births",
+                 "movie_ids", "movie_titles", "movie_years"]
+ARRAYS = ["person_offsets", "person_movies",
+          "movie_offsets", "movie_people", "name_order"]
+
+
+def source_key(filenames):
+    """
+    Returns a key identifying the current version of the given
+    source files, based on their sizes and modification times.
+    """
+    key = {}
+    for filename in filenames:
+        stat = os.stat(filename)
+        key[os.path.basename(filename)] = [stat.st_size, stat.st_mtime_ns]
+    return key
+
+
+def save(graph, path, key):
+    """
+    Writes a snapshot of graph to path, tagged with key.
+    The file is replaced atomically.
+    """
+    # Lista de (nome, buffer, typecode) na ordem em que serao escritos
+    sections = []
+    for name in STRING_TABLES:
+        table = getattr(graph, name)
+        sections.append((f"{name}.blob", table.blob, "B"))
+        sections.append((f"{name}.offsets", table.offsets, table.offsets.typecode))
+    for name in ARRAYS:
+        values = getattr(graph, name)
+        sections.append((name, values, values.typecode))
+
+    layout = {}
+    position = 0
+    for name, values, typecode in sections:
+        size = memoryview(values).nbytes
+        layout[name] = [position, size, typecode]
+        position += _padding(size)
+
+    header = json.dumps({
+        "byteorder": sys.byteorder,
+        "key": key,
+        "sections": layout
+    }).encode("utf-8")
+    header += b" " * (_padding(PREFIX.size + len(header)) - PREFIX.size - len(header))
+
+    temporary = f"{path}.tmp"
+    with open(temporary, "wb") as f:
+        f.write(PREFIX.pack(MAGIC, VERSION, len(header)))
+        f.write(header)
+        for name, values, typecode in sections:
+            data = memoryview(values).cast("B")
+            f.write(data)
+            f.write(b"\0" * (_padding(len(data)) - len(data)))
+    os.replace(temporary, path)
+
+
+def load(path, key):
+    """
+    Memory-maps the snapshot at path and returns its Graph.
+
+    Returns None if there is no snapshot, or if it was written by a
+    different version, on a different platform, or from different
+    source files than those identified by key.
+    """
+    try:
+        with open(path, "rb") as f:
+            prefix = f.read(PREFIX.size)
+            if len(prefix) < PREFIX.size:
+                return None
+            magic, version, header_size = PREFIX.unpack(prefix)
+            if magic != MAGIC or version != VERSION:
+                return None
+            header = json.loads(f.read(header_size))
+            if header["byteorder"] != sys.byteorder or header["key"] != key:
+                return None
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return None
+
+    view = memoryview(data)
+    start = PREFIX.size + header_size
+
+    def section(name):
+        position, size, typecode = header["sections"][name]
+        return view[start + position:start + position + size].cast(typecode)
+
+    fields = {}
+    for name in STRING_TABLES:
+        fields[name] = StringTable(
+            section(f"{name}.blob"), section(f"{name}.offsets")
+        )
+    for name in ARRAYS:
+        fields[name] = section(name)
+    return Graph(**fields)
+
+
+class Journal():
+    """
+    Append-only log of the changes made to a graph built from
+    the source files identified by key.
+    """
+
+    def __init__(self, path, key):
+        self.path = path
+        self.key = key
+
+    def records(self):
+        """
+        Returns the records in the journal, or an empty list
+        if there is none or it belongs to other source files.
+        """
+        records = []
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                if not self._matches(f.readline()):
+                    return []
+                for line in f:
+                    records.append(json.loads(line))
+        except OSError:
+            return []
+        except ValueError:
+            # Uma ultima linha incompleta indica uma escrita interrompida
+            pass
+        return records
+
+    def append(self, record):
+        """
+        Appends a record, starting a new journal if the current one
+        belongs to other source files.
+        """
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                current = self._matches(f.readline())
+        except OSError:
+            current = False
+        with open(self.path, "a" if current else "w", encoding="utf-8") as f:
+            if not current:
+                f.write(json.dumps({"key": self.key}) + "\n")
+            f.write(json.dumps(record) + "\n")
+
+    def _matches(self, line):
+        try:
+            return json.loads(line) == {"key": self.key}
+        except ValueError:
+            return False
+
+
+def _padding(size):
+    """
+    Rounds size up to the next multiple of ALIGNMENT.
+    """
+    return (size + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
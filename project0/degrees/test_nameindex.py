@@ -0,0 +1,61 @@
+import os
+import random
+import string
+import tempfile
+import unittest
+
+from nameindex import NameIndex, edit_distance
+
+
+def brute_force(people, query, max_distance):
+    """
+    Returns the sorted (distance, name, person_id) of every person whose
+    name is within max_distance edits of query.
+    """
+    key = query.lower()
+    matches = []
+    for person_id, name, _ in people:
+        distance = edit_distance(key, name.lower())
+        if distance <= max_distance:
+            matches.append((distance, name.lower(), person_id))
+    return sorted(matches)
+
+
+class FuzzyTest(unittest.TestCase):
+
+    def test_short_query(self):
+        index = NameIndex.build([("3", "Jo", "1990")])
+        self.assertEqual(index.fuzzy("Bo", max_distance=1), [("3", "Jo", "1990")])
+
+    def test_matches_brute_force(self):
+        rng = random.Random(0)
+        letters = string.ascii_lowercase[:6]
+        people = [
+            (str(number), "".join(rng.choice(letters) for _ in range(rng.randint(1, 7))), "")
+            for number in range(300)
+        ]
+        index = NameIndex.build(people)
+        for _ in range(300):
+            query = "".join(rng.choice(letters) for _ in range(rng.randint(1, 6)))
+            for max_distance in (1, 2, 3):
+                expected = [person_id for _, _, person_id
+                            in brute_force(people, query, max_distance)]
+                found = index.fuzzy(query, limit=len(people), max_distance=max_distance)
+                self.assertEqual([entry[0] for entry in found], expected,
+                                 (query, max_distance))
+
+    def test_saved_index(self):
+        people = [("1", "Jo", ""), ("2", "Tom Hanks", ""), ("3", "Ann", ""), ("4", "Bo", "")]
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "names")
+            NameIndex.build(people).save(path, "key")
+            index = NameIndex.build(people)
+            self.assertTrue(index.load(path, "key"))
+            self.assertFalse(NameIndex.build(people).load(path, "other"))
+        self.assertEqual([entry[0] for entry in index.fuzzy("jon", max_distance=2)],
+                         ["1", "3", "4"])
+        self.assertEqual([entry[0] for entry in index.fuzzy("tom hank")], ["2"])
+
+
+if __name__ == "__main__":
+    unittest.main()
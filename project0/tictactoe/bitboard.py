@@ -0,0 +1,132 @@
+"""
+Tic Tac Toe board stored as two 9-bit integers.
+
+A state is a pair (x, o) of masks with bit 3 * i + j set when X or O,
+respectively, has played at (i, j). Every function answers with a table
+lookup or a few bitwise operations, instead of copying and scanning
+a list of lists like the functions in tictactoe.py.
+"""
+
+from tictactoe import X, O, EMPTY
+
+# Mascara com as 9 casas do tabuleiro
+FULL = (1 << 9) - 1
+
+# Linhas, colunas e diagonais vencedoras
+WIN_MASKS = (
+    [0b111 << (3 * i) for i in range(3)]
+    + [0b1001001 << j for j in range(3)]
+    + [0b100010001, 0b001010100]
+)
+
+# Numero de bits de cada mascara
+POPCOUNT = [bin(mask).count("1") for mask in range(FULL + 1)]
+
+# Se cada mascara contem alguma linha vencedora
+WINNING = [any(mask & win == win for win in WIN_MASKS) for mask in range(FULL + 1)]
+
+# Jogadas (i, j) disponiveis para cada mascara de casas vazias
+ACTIONS = [
+    frozenset(divmod(cell, 3) for cell in range(9) if empty >> cell & 1)
+    for empty in range(FULL + 1)
+]
+
+
+def initial_state():
+    """
+    Returns the empty board.
+    """
+    return 0, 0
+
+
+def player(state):
+    """
+    Returns player who has the next turn on a board.
+    """
+    x, o = state
+    return X if POPCOUNT[x] == POPCOUNT[o] else O
+
+
+def actions(state):
+    """
+    Returns the set of all possible actions (i, j) available on the board.
+    """
+    x, o = state
+    return ACTIONS[FULL & ~(x | o)]
+
+
+def result(state, action):
+    """
+    Returns the board that results from making move (i, j) on the board.
+    """
+    i, j = action
+    if not (0 <= i < 3 and 0 <= j < 3):
+        raise ValueError("move out of bounds")
+    bit = 1 << (3 * i + j)
+    x, o = state
+    if (x | o) & bit:
+        raise ValueError("invalid move")
+    if POPCOUNT[x] == POPCOUNT[o]:
+        return x | bit, o
+    return x, o | bit
+
+
+def winner(state):
+    """
+    Returns the winner of the game, if there is one.
+    """
+    x, o = state
+    if WINNING[x]:
+        return X
+    if WINNING[o]:
+        return O
+    return None
+
+
+def terminal(state):
+    """
+    Returns True if game is over, False otherwise.
+    """
+    x, o = state
+    return (x | o) == FULL or WINNING[x] or WINNING[o]
+
+
+def utility(state):
+    """
+    Returns 1 if X has won the game, -1 if O has won, 0 otherwise.
+    """
+    x, o = state
+    if WINNING[x]:
+        return 1
+    if WINNING[o]:
+        return -1
+    return 0
+
+
+def from_board(board):
+    """
+    Converts a list-of-lists board from tictactoe.py into a state.
+    """
+    x = o = 0
+    for i in range(3):
+        for j in range(3):
+            if board[i][j] == X:
+                x |= 1 << (3 * i + j)
+            elif board[i][j] == O:
+                o |= 1 << (3 * i + j)
+    return x, o
+
+
+def to_board(state):
+    """
+    Converts a state into a list-of-lists board for tictactoe.py.
+    """
+    x, o = state
+    board = [[EMPTY] * 3 for _ in range(3)]
+    for cell in range(9):
+        i, j = divmod(cell, 3)
+        if x >> cell & 1:
+            board[i][j] = X
+        elif o >> cell & 1:
+            board[i][j] = O
+    return board
@@ -0,0 +1,58 @@
+"""
+Generates the Tic Tac Toe opening book.
+
+Usage: python book.py [path]
+
+Solves every position reachable from the empty board once and writes a
+table of 3^9 bytes, indexed by tictactoe.board_code, that holds the
+minimax value and an optimal move of each position. tictactoe.minimax
+then answers any position with a single lookup.
+"""
+
+import sys
+
+import tictactoe as ttt
+
+
+def generate():
+    """
+    Returns the book as a bytearray: for every reachable board, its
+    value plus one in the high bits and its optimal move (cell 3i + j,
+    or NO_MOVE when the game is over) in the low bits; UNREACHABLE for
+    every other code.
+    """
+    table = bytearray([ttt.UNREACHABLE]) * ttt.BOOK_SIZE
+    boards = [ttt.initial_state()]
+    while boards:
+        board = boards.pop()
+        code = ttt.board_code(board)
+        if table[code] != ttt.UNREACHABLE:
+            continue
+
+        if ttt.terminal(board):
+            value, move = ttt.utility(board), ttt.NO_MOVE
+        else:
+            if ttt.player(board) == ttt.X:
+                value, (i, j) = ttt.max_value(board)
+            else:
+                value, (i, j) = ttt.min_value(board)
+            move = 3 * i + j
+            boards.extend(ttt.result(board, action) for action in ttt.actions(board))
+        table[code] = (value + 1) << 4 | move
+    return table
+
+
+def main():
+    if len(sys.argv) > 2:
+        sys.exit("Usage: python book.py [path]")
+    path = sys.argv[1] if len(sys.argv) == 2 else ttt.BOOK_PATH
+
+    table = generate()
+    with open(path, "wb") as f:
+        f.write(table)
+    positions = sum(1 for entry in table if entry != ttt.UNREACHABLE)
+    print(f"Solved {positions} positions, written to {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,288 @@
+"""
+Generalized m,n,k-game: two players take turns on an m x n board and
+the first to get k marks in a row (horizontally, vertically or
+diagonally) wins. Tic Tac Toe is the 3,3,3-game; gomoku is 15,15,5.
+
+Boards are lists of lists of X, O and EMPTY, as in tictactoe.py, and
+Game offers the same player/actions/result/winner/terminal/utility
+functions for any m, n and k. Since these games are too large to search
+exhaustively, search runs alpha-beta searches of increasing depth until
+a time budget runs out, scoring the positions where it stops with a
+pluggable evaluation function.
+"""
+
+import math
+import time
+
+from tictactoe import X, O, EMPTY
+
+# Valor de uma vitoria; vitorias mais rapidas valem um pouco mais
+WIN = 10 ** 9
+
+
+class Game():
+    """
+    Rules of the m,n,k-game on a board of m rows and n columns.
+    """
+
+    def __init__(self, m=3, n=3, k=3):
+        if k > max(m, n):
+            raise ValueError("k must fit in the board")
+        self.m = m
+        self.n = n
+        self.k = k
+
+        # Todas as sequencias de k casas alinhadas
+        self.lines = []
+        for i in range(m):
+            for j in range(n):
+                for di, dj in ((0, 1), (1, 0), (1, 1), (1, -1)):
+                    end_i, end_j = i + (k - 1) * di, j + (k - 1) * dj
+                    if 0 <= end_i < m and 0 <= end_j < n:
+                        self.lines.append(tuple(
+                            (i + step * di, j + step * dj) for step in range(k)
+                        ))
+
+        # Sequencias que passam por cada casa
+        self.lines_through = {(i, j): [] for i in range(m) for j in range(n)}
+        for line in self.lines:
+            for cell in line:
+                self.lines_through[cell].append(line)
+
+        # Casas da mais central para a mais periferica
+        self.cells_by_center = sorted(
+            self.lines_through,
+            key=lambda cell: (abs(cell[0] - (m - 1) / 2) + abs(cell[1] - (n - 1) / 2))
+        )
+
+    def initial_state(self):
+        """
+        Returns starting state of the board.
+        """
+        return [[EMPTY] * self.n for _ in range(self.m)]
+
+    def player(self, board):
+        """
+        Returns player who has the next turn on a board.
+        """
+        x_active = sum(row.count(X) for row in board)
+        o_active = sum(row.count(O) for row in board)
+        return X if x_active == o_active else O
+
+    def actions(self, board):
+        """
+        Returns set of all possible actions (i, j) available on the board.
+        """
+        return {(i, j) for i in range(self.m) for j in range(self.n)
+                if board[i][j] == EMPTY}
+
+    def result(self, board, action):
+        """
+        Returns the board that results from making move (i, j) on the board.
+        """
+        i, j = action
+        if not (0 <= i < self.m and 0 <= j < self.n):
+            raise ValueError("move out of bounds")
+        if board[i][j] != EMPTY:
+            raise ValueError("invalid move")
+        return _play(board, action, self.player(board))
+
+    def winner(self, board):
+        """
+        Returns the winner of the game, if there is one.
+        """
+        for line in self.lines:
+            first = board[line[0][0]][line[0][1]]
+            if first != EMPTY and all(board[i][j] == first for i, j in line):
+                return first
+        return None
+
+    def terminal(self, board):
+        """
+        Returns True if game is over, False otherwise.
+        """
+        return (self.winner(board) is not None
+                or not any(EMPTY in row for row in board))
+
+    def utility(self, board):
+        """
+        Returns 1 if X has won the game, -1 if O has won, 0 otherwise.
+        """
+        winner = self.winner(board)
+        if winner == X:
+            return 1
+        if winner == O:
+            return -1
+        return 0
+
+    def completes_line(self, board, action):
+        """
+        Returns True if the mark at action is part of k in a row,
+        checking only the lines through that cell.
+        """
+        i, j = action
+        mark = board[i][j]
+        return mark != EMPTY and any(
+            all(board[a][b] == mark for a, b in line)
+            for line in self.lines_through[action]
+        )
+
+
+def line_heuristic(game, board):
+    """
+    Scores a board from X's point of view: every line still open to only
+    one player counts for that player, ten times more for each mark
+    it already has.
+    """
+    score = 0
+    for line in game.lines:
+        x_marks = o_marks = 0
+        for i, j in line:
+            cell = board[i][j]
+            if cell == X:
+                x_marks += 1
+            elif cell == O:
+                o_marks += 1
+        if x_marks and not o_marks:
+            score += 10 ** (x_marks - 1)
+        elif o_marks and not x_marks:
+            score -= 10 ** (o_marks - 1)
+    return score
+
+
+class _Timeout(Exception):
+    pass
+
+
+class Search():
+    """
+    Depth-limited alpha-beta search on a Game, abandoned with _Timeout
+    once the deadline passes.
+    """
+
+    def __init__(self, game, evaluate, deadline):
+        self.game = game
+        self.evaluate = evaluate
+        self.deadline = deadline
+        self.nodes = 0
+
+        # Se a ultima busca parou em alguma posicao nao terminal
+        self.cutoff = False
+
+    def root(self, board, depth, first=None):
+        """
+        Returns the value of the board for the player to move and their
+        best action, searching depth moves ahead and trying first first.
+        """
+        mark = self.game.player(board)
+        color = 1 if mark == X else -1
+        alpha, beta = -math.inf, math.inf
+        best_value, best_action = -math.inf, None
+        for action in self.ordered(board, first):
+            value = -self.negamax(_play(board, action, mark), action,
+                                  depth - 1, -beta, -alpha, -color, 1)
+            if value > best_value:
+                best_value, best_action = value, action
+            alpha = max(alpha, value)
+        return best_value, best_action
+
+    def negamax(self, board, last, depth, alpha, beta, color, ply):
+        """
+        Returns the value of the board for the player to move, whose
+        marks count as color (1 for X, -1 for O), after last was played.
+        """
+        # O relogio e consultado a cada no: em tabuleiros grandes um so
+        # no custa bem mais que a consulta
+        self.nodes += 1
+        if time.perf_counter() > self.deadline:
+            raise _Timeout
+
+        # A ultima jogada pode ter dado a vitoria ao adversario
+        if self.game.completes_line(board, last):
+            return -(WIN - ply)
+        actions = self.ordered(board)
+        if not actions:
+            return 0
+        if depth == 0:
+            self.cutoff = True
+            return color * self.evaluate(self.game, board)
+
+        mark = X if color == 1 else O
+        value = -math.inf
+        for action in actions:
+            value = max(value, -self.negamax(_play(board, action, mark), action,
+                                             depth - 1, -beta, -alpha, -color, ply + 1))
+            alpha = max(alpha, value)
+            if alpha >= beta:
+                break
+        return value
+
+    def ordered(self, board, first=None):
+        """
+        Returns the empty cells, first (if given) and then from the
+        center of the board outwards.
+        """
+        cells = [(i, j) for i, j in self.game.cells_by_center if board[i][j] == EMPTY]
+        if first in cells:
+            cells.remove(first)
+            cells.insert(0, first)
+        return cells
+
+
+def search(game, board, seconds=1.0, evaluate=line_heuristic, max_depth=None):
+    """
+    Returns the best action for the current player found within about
+    seconds, and a dictionary with the depth of the deepest completed
+    search, its value for the player, the number of positions visited
+    and the number visited per second.
+
+    Searches of depth 1, 2, ... are run until the time runs out, the
+    whole game tree fits in the search, or max_depth is reached; the
+    best action of each search is tried first by the next one.
+    evaluate(game, board) scores non-terminal positions from X's
+    point of view and must stay well below WIN in magnitude.
+    If the game is already over, returns None and an empty search.
+    """
+    if game.terminal(board):
+        return None, {"depth": 0, "value": None, "nodes": 0, "nodes_per_second": 0.0}
+
+    start = time.perf_counter()
+    searcher = Search(game, evaluate, start + seconds)
+    empty = sum(row.count(EMPTY) for row in board)
+    limit = empty if max_depth is None else min(max_depth, empty)
+
+    action = None
+    depth_reached = 0
+    value = None
+    for depth in range(1, limit + 1):
+        searcher.cutoff = False
+        try:
+            value, action = searcher.root(board, depth, action)
+        except _Timeout:
+            break
+        depth_reached = depth
+        # A arvore inteira coube na busca, ou o resultado ja esta decidido
+        if not searcher.cutoff or abs(value) > WIN // 2:
+            break
+
+    # Sem tempo nem para a profundidade 1: joga a casa mais central
+    if action is None and empty:
+        action = searcher.ordered(board)[0]
+
+    elapsed = time.perf_counter() - start
+    return action, {
+        "depth": depth_reached,
+        "value": value,
+        "nodes": searcher.nodes,
+        "nodes_per_second": searcher.nodes / elapsed if elapsed else 0.0
+    }
+
+
+def _play(board, action, mark):
+    """
+    Returns a copy of the board with mark placed at action.
+    """
+    i, j = action
+    new_board = [row[:] for row in board]
+    new_board[i][j] = mark
+    return new_board
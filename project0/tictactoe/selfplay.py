@@ -0,0 +1,138 @@
+"""
+Plays many Tic Tac Toe games without the graphical interface.
+
+Usage: python selfplay.py [--games N] [--opponent ai|random]
+                          [--tie-break random|first] [--workers N]
+                          [--seed S] [--output games.jsonl]
+
+The AI plays against itself or against a player that picks uniformly
+random moves, taking X in even-numbered games and O in odd-numbered
+ones. It always plays an optimal move: by default one picked at random
+among all optimal moves, so that games between two AIs differ, or with
+--tie-break first the single move tictactoe.minimax returns. Games are spread over a pool of processes and
+written, as they finish, one JSON object per line with the moves in
+order and the outcome. The number of games per second is reported on
+standard error.
+"""
+
+import argparse
+import json
+import multiprocessing
+import random
+import sys
+import time
+from collections import Counter
+
+import tictactoe as ttt
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Play Tic Tac Toe games in batch.")
+    parser.add_argument("--games", type=int, default=1000)
+    parser.add_argument("--opponent", choices=["ai", "random"], default="random",
+                        help="who plays against the AI")
+    parser.add_argument("--tie-break", choices=["random", "first"], default="random",
+                        help="how the AI picks among equally good moves")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="number of worker processes")
+    parser.add_argument("--seed", type=int, default=0,
+                        help="seed of the random players")
+    parser.add_argument("--output", help="JSON lines file for the games (default: stdout)")
+    args = parser.parse_args()
+
+    output = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+    start = time.perf_counter()
+    outcomes = Counter()
+    try:
+        for game in play_games(args.games, args.opponent, args.workers, args.seed,
+                               args.tie_break):
+            output.write(json.dumps(game) + "\n")
+            output.flush()
+            outcomes[game["winner"] or "tie"] += 1
+    finally:
+        if output is not sys.stdout:
+            output.close()
+
+    elapsed = time.perf_counter() - start
+    rate = args.games / elapsed if elapsed else 0.0
+    print(f"{args.games} games in {elapsed:.2f}s ({rate:,.0f} games/s): "
+          f"X won {outcomes[ttt.X]}, O won {outcomes[ttt.O]}, "
+          f"{outcomes['tie']} ties", file=sys.stderr)
+
+
+def play_games(games, opponent="random", workers=1, seed=0, tie_break="random"):
+    """
+    Yields the result of each of the given number of games, in the
+    order they finish, playing them on workers processes.
+    """
+    numbers = ((number, opponent, seed, tie_break) for number in range(games))
+    if workers == 1:
+        yield from map(play_game, numbers)
+        return
+
+    chunksize = max(1, games // (workers * 4))
+    with multiprocessing.Pool(workers) as pool:
+        yield from pool.imap_unordered(play_game, numbers, chunksize)
+
+
+def play_game(task):
+    """
+    Plays game number `number` of a batch and returns a dictionary with
+    who played each side, how the AI broke ties between optimal moves,
+    the (i, j) moves in order and the winner (None for a tie).
+    """
+    number, opponent, seed, tie_break = task
+    rng = random.Random(seed * 1000003 + number)
+
+    # A IA alterna entre X e O a cada partida
+    players = {ttt.X: "ai", ttt.O: opponent}
+    if number % 2 == 1:
+        players = {ttt.X: opponent, ttt.O: "ai"}
+
+    board = ttt.initial_state()
+    moves = []
+    while not ttt.terminal(board):
+        if players[ttt.player(board)] != "ai":
+            move = rng.choice(sorted(ttt.actions(board)))
+        elif tie_break == "random":
+            move = rng.choice(optimal_actions(board))
+        else:
+            move = ttt.minimax(board)
+        board = ttt.result(board, move)
+        moves.append(list(move))
+
+    return {
+        "game": number,
+        "x": players[ttt.X],
+        "o": players[ttt.O],
+        "tie_break": tie_break,
+        "moves": moves,
+        "winner": ttt.winner(board)
+    }
+
+
+def optimal_actions(board):
+    """
+    Returns, sorted, every action on the board
+    that keeps the game's minimax value.
+    """
+    values = {action: value(ttt.result(board, action)) for action in ttt.actions(board)}
+    best = max(values.values()) if ttt.player(board) == ttt.X else min(values.values())
+    return sorted(action for action, action_value in values.items() if action_value == best)
+
+
+def value(board):
+    """
+    Returns the minimax value of the board, from the opening book
+    when there is one.
+    """
+    entry = ttt.book_entry(board)
+    if entry is not None:
+        return entry[0]
+    if ttt.player(board) == ttt.X:
+        return ttt.max_value(board)[0]
+    return ttt.min_value(board)[0]
+
+
+if __name__ == "__main__":
+    main()
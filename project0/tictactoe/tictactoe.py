@@ -3,6 +3,7 @@ Tic Tac Toe Player
 """
 
 import math
+import os
 import sys
 import copy
 
@@ -10,6 +11,59 @@ X = "X"
 O = "O"
 EMPTY = None
 
+# Tipos de valor guardados na tabela de transposicao: exato, ou apenas
+# um limite inferior ou superior quando a poda alfa-beta cortou a busca
+EXACT = "exact"
+LOWER = "lower"
+UPPER = "upper"
+
+# Ordem em que a busca alfa-beta tenta as jogadas: centro, cantos, bordas
+MOVE_ORDER = [(1, 1), (0, 0), (0, 2), (2, 0), (2, 2),
+              (0, 1), (1, 0), (1, 2), (2, 1)]
+
+# Tabela de transposicao: chave canonica de cada tabuleiro ja avaliado
+# -> (valor minimax, jogada otima na orientacao canonica, tipo do valor)
+transposition_table = {}
+
+# Numero de posicoes visitadas pela ultima busca
+nodes_explored = 0
+
+# Livro de aberturas gerado por book.py, ao lado deste arquivo
+BOOK_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "tictactoe.book")
+
+# Tamanho do livro: um byte por codigo em base 3 de um tabuleiro
+BOOK_SIZE = 3 ** 9
+
+# Byte do livro para tabuleiros finalizados ou inalcancaveis
+NO_MOVE = 9
+UNREACHABLE = 0xFF
+
+# Conteudo do livro, lido no primeiro uso (b"" se nao houver livro)
+book = None
+
+
+def symmetries():
+    """
+    Returns the 8 rotations and reflections of the board as permutations
+    of its cells: cell k of the transformed board is cell symmetry[k].
+    """
+    permutations = []
+    for rotation in range(4):
+        for reflect in (False, True):
+            symmetry = []
+            for k in range(9):
+                i, j = divmod(k, 3)
+                if reflect:
+                    j = 2 - j
+                for _ in range(rotation):
+                    i, j = j, 2 - i
+                symmetry.append(3 * i + j)
+            permutations.append(tuple(symmetry))
+    return permutations
+
+
+SYMMETRIES = symmetries()
+
 
 def initial_state():
     """
@@ -158,10 +212,58 @@ def utility(board):
     # Caso seja empate, utilidade = 0
     return 0
 
+def canonical(board):
+    """
+    Returns the key of a board that is shared by all of its rotations
+    and reflections, and the symmetry that maps the board to it.
+    """
+    cells = "".join(cell or "." for row in board for cell in row)
+    return min(
+        ("".join(cells[k] for k in symmetry), symmetry)
+        for symmetry in SYMMETRIES
+    )
+
+
+def lookup(board):
+    """
+    Returns the value, best action and kind of value (EXACT, LOWER or
+    UPPER bound) stored in the transposition table for a board, or None
+    if the board was not searched yet.
+    """
+    key, symmetry = canonical(board)
+    entry = transposition_table.get(key)
+    if entry is None:
+        return None
+    value, action, kind = entry
+    if action is not None:
+        # Converte a jogada da orientacao canonica para a do tabuleiro
+        action = divmod(symmetry[3 * action[0] + action[1]], 3)
+    return value, action, kind
+
+
+def store(board, value, action, kind=EXACT):
+    """
+    Stores the value and best action of a board
+    in the transposition table.
+    """
+    key, symmetry = canonical(board)
+    if action is not None:
+        action = divmod(symmetry.index(3 * action[0] + action[1]), 3)
+    transposition_table[key] = (value, action, kind)
+
+
 # Maximiza a jogada (Jogador X) 
 
 
 def max_value(board):
+    global nodes_explored
+    nodes_explored += 1
+
+    # Posicao (ou uma simetrica) ja avaliada
+    entry = lookup(board)
+    if entry is not None and entry[2] == EXACT:
+        return entry[:2]
+
     # Melhor jogada
     optimal_action = None 
     
@@ -179,12 +281,21 @@ def max_value(board):
             v = maximo
             optimal_action = action  
               
+    store(board, v, optimal_action)
     return v, optimal_action
 
 # Minimiza a jogada (Jogador O)
 
 
 def min_value(board):
+    global nodes_explored
+    nodes_explored += 1
+
+    # Posicao (ou uma simetrica) ja avaliada
+    entry = lookup(board)
+    if entry is not None and entry[2] == EXACT:
+        return entry[:2]
+
     # Melhor jogada
     optimal_action = None
     
@@ -202,13 +313,25 @@ def min_value(board):
             v = minimo
             optimal_action = action
         
+    store(board, v, optimal_action)
     return v, optimal_action
     
     
 def minimax(board):
     """
     Returns the optimal action for the current player on the board.
+
+    Reachable positions are answered from the opening book, if one was
+    generated; other positions are memoized up to symmetry in
+    transposition_table, which is kept between calls.
     """
+    global nodes_explored
+    nodes_explored = 0
+
+    entry = book_entry(board)
+    if entry is not None:
+        return entry[1]
+
     # Caso seja um tabuleiro finalizado, retorna none
     if terminal(board):
         return None
@@ -219,4 +342,173 @@ def minimax(board):
     
     # Caso seja a vez do jogador O
     elif player(board) == O:
-        return min_value(board)[1]
\ No newline at end of file
+        return min_value(board)[1]
+
+
+def ordered_actions(board, best=None):
+    """
+    Returns the actions available on the board in the order alpha-beta
+    search tries them: the best action found by an earlier search first,
+    then the center, the corners and the edges.
+    """
+    moves = [(i, j) for i, j in MOVE_ORDER if board[i][j] == EMPTY]
+    if best in moves:
+        moves.remove(best)
+        moves.insert(0, best)
+    return moves
+
+
+def alpha_beta_max(board, alpha, beta):
+    """
+    Returns the value of the board for X and an optimal action, as
+    max_value, skipping actions that cannot change the result: if the
+    value is at most alpha or at least beta, only that is guaranteed.
+    """
+    global nodes_explored
+    nodes_explored += 1
+
+    if terminal(board):
+        return utility(board), None
+
+    # Um valor guardado pode resolver a posicao ou estreitar a janela
+    best = None
+    original_alpha, original_beta = alpha, beta
+    entry = lookup(board)
+    if entry is not None:
+        value, best, kind = entry
+        if kind == EXACT:
+            return value, best
+        if kind == LOWER:
+            alpha = max(alpha, value)
+        else:
+            beta = min(beta, value)
+        if alpha >= beta:
+            return value, best
+
+    v = -math.inf
+    optimal_action = None
+    for action in ordered_actions(board, best):
+        value, _ = alpha_beta_min(result(board, action), alpha, beta)
+        if value > v:
+            v = value
+            optimal_action = action
+        alpha = max(alpha, v)
+        # O jogador O nunca deixaria a partida chegar aqui
+        if alpha >= beta:
+            break
+
+    store(board, v, optimal_action, _kind(v, original_alpha, original_beta))
+    return v, optimal_action
+
+
+def alpha_beta_min(board, alpha, beta):
+    """
+    Returns the value of the board for X and an optimal action for O,
+    as min_value, with the same pruning as alpha_beta_max.
+    """
+    global nodes_explored
+    nodes_explored += 1
+
+    if terminal(board):
+        return utility(board), None
+
+    best = None
+    original_alpha, original_beta = alpha, beta
+    entry = lookup(board)
+    if entry is not None:
+        value, best, kind = entry
+        if kind == EXACT:
+            return value, best
+        if kind == LOWER:
+            alpha = max(alpha, value)
+        else:
+            beta = min(beta, value)
+        if alpha >= beta:
+            return value, best
+
+    v = math.inf
+    optimal_action = None
+    for action in ordered_actions(board, best):
+        value, _ = alpha_beta_max(result(board, action), alpha, beta)
+        if value < v:
+            v = value
+            optimal_action = action
+        beta = min(beta, v)
+        # O jogador X nunca deixaria a partida chegar aqui
+        if alpha >= beta:
+            break
+
+    store(board, v, optimal_action, _kind(v, original_alpha, original_beta))
+    return v, optimal_action
+
+
+def _kind(value, alpha, beta):
+    """
+    Returns what a value found by searching with an (alpha, beta)
+    window says about the true value of the position.
+    """
+    if value <= alpha:
+        return UPPER
+    if value >= beta:
+        return LOWER
+    return EXACT
+
+
+def alphabeta(board):
+    """
+    Returns an optimal action for the current player on the board, like
+    minimax, using alpha-beta pruning. The number of positions visited
+    is left in nodes_explored. Reachable positions are answered from
+    the opening book, if one was generated.
+    """
+    global nodes_explored
+    nodes_explored = 0
+
+    entry = book_entry(board)
+    if entry is not None:
+        return entry[1]
+
+    if terminal(board):
+        return None
+
+    if player(board) == X:
+        return alpha_beta_max(board, -math.inf, math.inf)[1]
+    return alpha_beta_min(board, -math.inf, math.inf)[1]
+
+
+def board_code(board):
+    """
+    Returns the number whose base 3 digits are the cells of the board
+    (0 for EMPTY, 1 for X, 2 for O), from the last cell to the first.
+    """
+    code = 0
+    for row in reversed(board):
+        for cell in reversed(row):
+            code = 3 * code + (0 if cell == EMPTY else 1 if cell == X else 2)
+    return code
+
+
+def book_entry(board):
+    """
+    Returns the (value, optimal action) of the board stored in the
+    opening book, or None if there is no book or the board cannot be
+    reached in a game.
+    """
+    global book
+    if book is None:
+        try:
+            with open(BOOK_PATH, "rb") as f:
+                book = f.read()
+        except OSError:
+            book = b""
+        if len(book) != BOOK_SIZE:
+            book = b""
+    if not book:
+        return None
+
+    entry = book[board_code(board)]
+    if entry == UNREACHABLE:
+        return None
+    # Valor (-1, 0 ou 1) nos bits altos, jogada (casa 3i + j) nos baixos
+    move = entry & 0x0F
+    return (entry >> 4) - 1, None if move == NO_MOVE else divmod(move, 3)
@@ -1,7 +1,53 @@
 import itertools
+import weakref
 
 
 class Sentence():
+    """
+    Immutable logical sentence.
+
+    Sentences are hash-consed: constructing a sentence equal to one that
+    already exists returns the existing object, so identical subformulas
+    are stored once, equality is identity, and the hash and set of
+    symbols of each sentence are computed at most once.
+    """
+
+    __slots__ = ("_hash", "_symbols", "__weakref__")
+
+    # Sentencas existentes, pela classe e pelos argumentos do construtor
+    _instances = weakref.WeakValueDictionary()
+
+    @classmethod
+    def _intern(cls, key, **fields):
+        """
+        Returns the sentence identified by key, creating it with
+        the given fields if there is none.
+        """
+        sentence = Sentence._instances.get(key)
+        if sentence is None:
+            sentence = object.__new__(cls)
+            for name, value in fields.items():
+                object.__setattr__(sentence, name, value)
+            object.__setattr__(sentence, "_hash", hash(key))
+            object.__setattr__(sentence, "_symbols", None)
+            Sentence._instances[key] = sentence
+        return sentence
+
+    def __setattr__(self, name, value):
+        raise AttributeError("sentences are immutable")
+
+    def __eq__(self, other):
+        return self is other
+
+    def __hash__(self):
+        return self._hash
+
+    def __reduce__(self):
+        return type(self), self.arguments()
+
+    def arguments(self):
+        """Returns the arguments the sentence was constructed with."""
+        return ()
 
     def evaluate(self, model):
         """Evaluates the logical sentence."""
@@ -12,8 +58,38 @@ class Sentence():
         return ""
 
     def symbols(self):
-        """Returns a set of all symbols in the logical sentence."""
-        return set()
+        """Returns a frozen set of all symbols in the logical sentence."""
+        if self._symbols is None:
+            symbols = frozenset().union(
+                *[argument.symbols() for argument in self.arguments()]
+            )
+            object.__setattr__(self, "_symbols", symbols)
+        return self._symbols
+
+    def expression(self, slots):
+        """
+        Returns Python source for a boolean expression evaluating the
+        sentence on a model given as an integer m, in which the symbol
+        named name is true when bit slots[name] of m is set.
+        """
+        raise Exception("nothing to compile")
+
+    def compile(self, symbols=None):
+        """
+        Returns a function evaluating the sentence on an integer model,
+        in which bit i is the value of the i-th name in symbols
+        (by default, the sentence's symbols in sorted order).
+        """
+        if symbols is None:
+            symbols = sorted(self.symbols())
+        slots = {name: i for i, name in enumerate(symbols)}
+        try:
+            return eval(f"lambda m: {self.expression(slots)}")
+        except (SyntaxError, RecursionError, MemoryError):
+            # Sentencas profundas demais para o compilador do Python
+            return lambda m: self.evaluate(
+                {name: bool(m >> i & 1) for name, i in slots.items()}
+            )
 
     @classmethod
     def validate(cls, sentence):
@@ -43,15 +119,10 @@ class Sentence():
 
 
 class Symbol(Sentence):
+    __slots__ = ("name",)
 
-    def __init__(self, name):
-        self.name = name
-
-    def __eq__(self, other):
-        return isinstance(other, Symbol) and self.name == other.name
-
-    def __hash__(self):
-        return hash(("symbol", self.name))
+    def __new__(cls, name):
+        return cls._intern(("symbol", name), name=name)
 
     def __repr__(self):
         return self.name
@@ -65,20 +136,27 @@ class Symbol(Sentence):
     def formula(self):
         return self.name
 
+    def arguments(self):
+        return (self.name,)
+
     def symbols(self):
-        return {self.name}
+        if self._symbols is None:
+            object.__setattr__(self, "_symbols", frozenset([self.name]))
+        return self._symbols
 
+    def expression(self, slots):
+        try:
+            return f"m >> {slots[self.name]} & 1 == 1"
+        except KeyError:
+            raise Exception(f"variable {self.name} not in model")
 
-class Not(Sentence):
-    def __init__(self, operand):
-        Sentence.validate(operand)
-        self.operand = operand
 
-    def __eq__(self, other):
-        return isinstance(other, Not) and self.operand == other.operand
+class Not(Sentence):
+    __slots__ = ("operand",)
 
-    def __hash__(self):
-        return hash(("not", hash(self.operand)))
+    def __new__(cls, operand):
+        Sentence.validate(operand)
+        return cls._intern(("not", operand), operand=operand)
 
     def __repr__(self):
         return f"Not({self.operand})"
@@ -89,23 +167,20 @@ class Not(Sentence):
     def formula(self):
         return "¬" + Sentence.parenthesize(self.operand.formula())
 
-    def symbols(self):
-        return self.operand.symbols()
+    def arguments(self):
+        return (self.operand,)
+
+    def expression(self, slots):
+        return f"not ({self.operand.expression(slots)})"
 
 
 class And(Sentence):
-    def __init__(self, *conjuncts):
+    __slots__ = ("conjuncts",)
+
+    def __new__(cls, *conjuncts):
         for conjunct in conjuncts:
             Sentence.validate(conjunct)
-        self.conjuncts = list(conjuncts)
-
-    def __eq__(self, other):
-        return isinstance(other, And) and self.conjuncts == other.conjuncts
-
-    def __hash__(self):
-        return hash(
-            ("and", tuple(hash(conjunct) for conjunct in self.conjuncts))
-        )
+        return cls._intern(("and", conjuncts), conjuncts=conjuncts)
 
     def __repr__(self):
         conjunctions = ", ".join(
@@ -114,8 +189,9 @@ class And(Sentence):
         return f"And({conjunctions})"
 
     def add(self, conjunct):
-        Sentence.validate(conjunct)
-        self.conjuncts.append(conjunct)
+        raise TypeError(
+            "sentences are immutable: use And(*sentence.conjuncts, conjunct)"
+        )
 
     def evaluate(self, model):
         return all(conjunct.evaluate(model) for conjunct in self.conjuncts)
@@ -126,23 +202,23 @@ class And(Sentence):
         return " ∧ ".join([Sentence.parenthesize(conjunct.formula())
                            for conjunct in self.conjuncts])
 
-    def symbols(self):
-        return set.union(*[conjunct.symbols() for conjunct in self.conjuncts])
+    def arguments(self):
+        return self.conjuncts
+
+    def expression(self, slots):
+        if not self.conjuncts:
+            return "True"
+        return " and ".join(f"({conjunct.expression(slots)})"
+                            for conjunct in self.conjuncts)
 
 
 class Or(Sentence):
-    def __init__(self, *disjuncts):
+    __slots__ = ("disjuncts",)
+
+    def __new__(cls, *disjuncts):
         for disjunct in disjuncts:
             Sentence.validate(disjunct)
-        self.disjuncts = list(disjuncts)
-
-    def __eq__(self, other):
-        return isinstance(other, Or) and self.disjuncts == other.disjuncts
-
-    def __hash__(self):
-        return hash(
-            ("or", tuple(hash(disjunct) for disjunct in self.disjuncts))
-        )
+        return cls._intern(("or", disjuncts), disjuncts=disjuncts)
 
     def __repr__(self):
         disjuncts = ", ".join([str(disjunct) for disjunct in self.disjuncts])
@@ -157,24 +233,24 @@ class Or(Sentence):
         return " ∨  ".join([Sentence.parenthesize(disjunct.formula())
                             for disjunct in self.disjuncts])
 
-    def symbols(self):
-        return set.union(*[disjunct.symbols() for disjunct in self.disjuncts])
+    def arguments(self):
+        return self.disjuncts
+
+    def expression(self, slots):
+        if not self.disjuncts:
+            return "False"
+        return " or ".join(f"({disjunct.expression(slots)})"
+                           for disjunct in self.disjuncts)
 
 
 class Implication(Sentence):
-    def __init__(self, antecedent, consequent):
+    __slots__ = ("antecedent", "consequent")
+
+    def __new__(cls, antecedent, consequent):
         Sentence.validate(antecedent)
         Sentence.validate(consequent)
-        self.antecedent = antecedent
-        self.consequent = consequent
-
-    def __eq__(self, other):
-        return (isinstance(other, Implication)
-                and self.antecedent == other.antecedent
-                and self.consequent == other.consequent)
-
-    def __hash__(self):
-        return hash(("implies", hash(self.antecedent), hash(self.consequent)))
+        return cls._intern(("implies", antecedent, consequent),
+                           antecedent=antecedent, consequent=consequent)
 
     def __repr__(self):
         return f"Implication({self.antecedent}, {self.consequent})"
@@ -188,76 +264,150 @@ class Implication(Sentence):
         consequent = Sentence.parenthesize(self.consequent.formula())
         return f"{antecedent} => {consequent}"
 
-    def symbols(self):
-        return set.union(self.antecedent.symbols(), self.consequent.symbols())
+    def arguments(self):
+        return (self.antecedent, self.consequent)
+
+    def expression(self, slots):
+        return (f"not ({self.antecedent.expression(slots)})"
+                f" or ({self.consequent.expression(slots)})")
 
 
 class Biconditional(Sentence):
-    def __init__(self, left, right):
+    __slots__ = ("left", "right")
+
+    def __new__(cls, left, right):
         Sentence.validate(left)
         Sentence.validate(right)
-        self.left = left
-        self.right = right
-
-    def __eq__(self, other):
-        return (isinstance(other, Biconditional)
-                and self.left == other.left
-                and self.right == other.right)
-
-    def __hash__(self):
-        return hash(("biconditional", hash(self.left), hash(self.right)))
+        return cls._intern(("biconditional", left, right), left=left, right=right)
 
     def __repr__(self):
         return f"Biconditional({self.left}, {self.right})"
 
     def evaluate(self, model):
-        return ((self.left.evaluate(model)
-                 and self.right.evaluate(model))
-                or (not self.left.evaluate(model)
-                    and not self.right.evaluate(model)))
+        return self.left.evaluate(model) == self.right.evaluate(model)
 
     def formula(self):
         left = Sentence.parenthesize(str(self.left))
         right = Sentence.parenthesize(str(self.right))
         return f"{left} <=> {right}"
 
-    def symbols(self):
-        return set.union(self.left.symbols(), self.right.symbols())
-
-
-def model_check(knowledge, query):
-    """Checks if knowledge base entails query."""
-
-    def check_all(knowledge, query, symbols, model):
-        """Checks if knowledge base entails query, given a particular model."""
-
-        # If model has an assignment for each symbol
-        if not symbols:
-
-            # If knowledge base is true in model, then query must also be true
-            if knowledge.evaluate(model):
-                return query.evaluate(model)
-            return True
-        else:
-
-            # Choose one of the remaining unused symbols
-            remaining = symbols.copy()
-            p = remaining.pop()
-
-            # Create a model where the symbol is true
-            model_true = model.copy()
-            model_true[p] = True
-
-            # Create a model where the symbol is false
-            model_false = model.copy()
-            model_false[p] = False
-
-            # Ensure entailment holds in both models
-            return (check_all(knowledge, query, remaining, model_true) and
-                    check_all(knowledge, query, remaining, model_false))
+    def arguments(self):
+        return (self.left, self.right)
+
+    def expression(self, slots):
+        return f"({self.left.expression(slots)}) == ({self.right.expression(slots)})"
+
+
+class KnowledgeBase():
+    """
+    Knowledge base that grows one sentence at a time.
+
+    Sentences are encoded into the clauses of a single SAT solver as they
+    are added, and each query is checked under the assumption that it is
+    false, without adding it to the clauses. The encoding of every
+    subsentence and the clauses learned by the solver are kept between
+    queries, so each check builds on the work done by the previous ones.
+    """
+
+    def __init__(self, *sentences):
+        from sat import Encoder, Solver
+        self.sentences = []
+        self.solver = Solver()
+        self.encoder = Encoder(self.solver)
+        for sentence in sentences:
+            self.add(sentence)
+
+    def __len__(self):
+        return len(self.sentences)
+
+    def add(self, sentence):
+        """Adds a sentence to the knowledge base."""
+        Sentence.validate(sentence)
+        self.sentences.append(sentence)
+        self.encoder.add(sentence)
+
+    def sentence(self):
+        """Returns the conjunction of all sentences added so far."""
+        return And(*self.sentences)
+
+    def satisfiable(self):
+        """Checks if some model makes every sentence true."""
+        return self.solver.solve()
+
+    def entails(self, query):
+        """Checks if knowledge base entails query."""
+        Sentence.validate(query)
+        return not self.solver.solve([-self.encoder.literal(query)])
+
+    def entails_all(self, queries):
+        """
+        Returns a dictionary mapping each of the queries to
+        whether the knowledge base entails it.
+        """
+        from sat import check_queries
+        for query in queries:
+            Sentence.validate(query)
+        return check_queries(self.encoder, queries)
+
+
+def model_check(knowledge, query, method="sat"):
+    """
+    Checks if knowledge base entails query.
+
+    By default the sentences are converted to CNF and decided by the
+    SAT solver in sat.py; method="enumerate" checks every model instead,
+    evaluating compiled versions of the sentences, and method="vectorized"
+    evaluates them over all models at once with NumPy (see vectorized.py).
+    """
+    if method == "sat":
+        from sat import entails
+        return entails(knowledge, query)
+    if method == "vectorized":
+        # Depende do NumPy, importado apenas quando usado
+        from vectorized import entails
+        return entails(knowledge, query)
+    if method != "enumerate":
+        raise ValueError(f"unknown method {method}")
 
     # Get all symbols in both knowledge and query
-    symbols = set.union(knowledge.symbols(), query.symbols())
-
-    # Check that knowledge entails query
-    return check_all(knowledge, query, symbols, dict())
+    symbols = sorted(knowledge.symbols() | query.symbols())
+
+    # Each model is an integer whose bits are the values of the symbols
+    knowledge = knowledge.compile(symbols)
+    query = query.compile(symbols)
+
+    # If knowledge base is true in a model, then query must also be true
+    return all(query(model) for model in range(2 ** len(symbols))
+               if knowledge(model))
+
+
+def model_check_all(knowledge, queries, method="sat"):
+    """
+    Returns a dictionary mapping each of the queries to whether the
+    knowledge base entails it.
+
+    The work on the knowledge base is shared by all queries: its CNF
+    and learned clauses with the SAT solver, its truth table with
+    method="vectorized", and its list of models with method="enumerate".
+    """
+    if method == "sat":
+        from sat import entails_all
+        return entails_all(knowledge, queries)
+    if method == "vectorized":
+        from vectorized import entails_all
+        return entails_all(knowledge, queries)
+    if method != "enumerate":
+        raise ValueError(f"unknown method {method}")
+
+    symbols = sorted(knowledge.symbols().union(*[query.symbols() for query in queries]))
+
+    # Enumera uma unica vez os modelos da base de conhecimento
+    satisfies = knowledge.compile(symbols)
+    models = [model for model in range(2 ** len(symbols)) if satisfies(model)]
+
+    results = {}
+    for query in queries:
+        if query not in results:
+            query_holds = query.compile(symbols)
+            results[query] = all(query_holds(model) for model in models)
+    return results
@@ -0,0 +1,448 @@
+"""
+SAT backend for logic.model_check.
+
+Sentences are converted to conjunctive normal form with the Tseitin
+encoding: every compound subsentence gets a new variable together with
+clauses stating that the variable is equivalent to it, so the CNF grows
+linearly with the sentence instead of exponentially. The clauses are
+decided by a CDCL solver (unit propagation with two watched literals per
+clause, conflict-driven clause learning, non-chronological backjumping
+and VSIDS branching), and entailment is checked as the unsatisfiability
+of the knowledge base under the assumption that the query is false.
+"""
+
+import heapq
+
+from logic import And, Biconditional, Implication, Not, Or, Symbol
+
+# Fator de decaimento da atividade das variaveis (VSIDS)
+DECAY = 0.95
+
+# Limite de atividade a partir do qual todas sao reescaladas
+RESCALE = 1e100
+
+
+class Solver():
+    """
+    CDCL SAT solver over variables 1, 2, ... and literals v / -v.
+    Clauses may be added between calls to solve, and learned clauses
+    are kept, so related problems can be solved incrementally.
+    """
+
+    def __init__(self):
+        self.num_variables = 0
+        self.clauses = []
+        self.learned = []
+
+        # Por variavel: valor (1, -1 ou 0 se livre), nivel de decisao,
+        # clausula que a implicou, atividade e ultimo valor atribuido
+        self.values = [0]
+        self.levels = [0]
+        self.reasons = [None]
+        self.activity = [0.0]
+        self.phase = [False]
+        self.increment = 1.0
+        self.heap = []
+
+        # Clausulas que observam cada literal, indexadas por _index
+        self.watches = [[], []]
+
+        # Literais atribuidos, em ordem, e onde comeca cada nivel de decisao
+        self.trail = []
+        self.limits = []
+        self.head = 0
+
+        # False quando as clausulas ja sao insatisfativeis sem suposicoes
+        self.ok = True
+
+        # Valor de cada variavel na ultima solucao encontrada
+        self.model = None
+
+        self.conflicts = 0
+        self.decisions = 0
+
+    def new_variable(self):
+        """
+        Adds a variable and returns its number.
+        """
+        self.num_variables += 1
+        variable = self.num_variables
+        self.values.append(0)
+        self.levels.append(0)
+        self.reasons.append(None)
+        self.activity.append(0.0)
+        self.phase.append(False)
+        self.watches.extend(([], []))
+        heapq.heappush(self.heap, (0.0, variable))
+        return variable
+
+    def add_clause(self, literals):
+        """
+        Adds the disjunction of literals. Returns False if the
+        clauses became unsatisfiable.
+        """
+        if not self.ok:
+            return False
+        self._cancel(0)
+
+        clause = []
+        for literal in literals:
+            value = self._value(literal)
+            # Clausula ja satisfeita no nivel 0, ou tautologica
+            if value == 1 or -literal in clause:
+                return True
+            if value == 0 and literal not in clause:
+                clause.append(literal)
+
+        if not clause:
+            self.ok = False
+        elif len(clause) == 1:
+            self._assign(clause[0], None)
+            self.ok = self._propagate() is None
+        else:
+            self._attach(clause)
+            self.clauses.append(clause)
+        return self.ok
+
+    def solve(self, assumptions=()):
+        """
+        Returns True if the clauses are satisfiable with all of the
+        assumption literals true, and then stores a satisfying
+        assignment in model (model[v] is the value of variable v).
+        """
+        self.model = None
+        if not self.ok:
+            return False
+        self._cancel(0)
+
+        while True:
+            conflict = self._propagate()
+            if conflict is not None:
+                self.conflicts += 1
+                if not self.limits:
+                    self.ok = False
+                    return False
+                learned, level = self._analyze(conflict)
+                self._cancel(level)
+                if len(learned) == 1:
+                    self._assign(learned[0], None)
+                else:
+                    self._attach(learned)
+                    self.learned.append(learned)
+                    self._assign(learned[0], learned)
+                self.increment /= DECAY
+                continue
+
+            # As suposicoes sao as primeiras decisoes, uma por nivel
+            level = len(self.limits)
+            if level < len(assumptions):
+                literal = assumptions[level]
+                value = self._value(literal)
+                if value == -1:
+                    self._cancel(0)
+                    return False
+                self.limits.append(len(self.trail))
+                if value == 0:
+                    self._assign(literal, None)
+                continue
+
+            variable = self._pick()
+            if variable is None:
+                self.model = [value == 1 for value in self.values]
+                self._cancel(0)
+                return True
+            self.decisions += 1
+            self.limits.append(len(self.trail))
+            self._assign(variable if self.phase[variable] else -variable, None)
+
+    def _value(self, literal):
+        value = self.values[abs(literal)]
+        return value if literal > 0 else -value
+
+    def _assign(self, literal, reason):
+        variable = abs(literal)
+        self.values[variable] = 1 if literal > 0 else -1
+        self.levels[variable] = len(self.limits)
+        self.reasons[variable] = reason
+        self.trail.append(literal)
+
+    def _attach(self, clause):
+        self.watches[_index(clause[0])].append(clause)
+        self.watches[_index(clause[1])].append(clause)
+
+    def _propagate(self):
+        """
+        Assigns the literals implied by unit clauses until none is left.
+        Returns a clause whose literals are all false, if one is found.
+        """
+        watches = self.watches
+        values = self.values
+        while self.head < len(self.trail):
+            false = -self.trail[self.head]
+            self.head += 1
+
+            watchers = watches[_index(false)]
+            kept = []
+            conflict = None
+            for position, clause in enumerate(watchers):
+                # Mantem o literal que ficou falso na segunda posicao
+                if clause[0] == false:
+                    clause[0], clause[1] = clause[1], false
+                first = clause[0]
+                first_value = values[abs(first)] if first > 0 else -values[abs(first)]
+                if first_value == 1:
+                    kept.append(clause)
+                    continue
+
+                # Procura outro literal nao falso para observar
+                for k in range(2, len(clause)):
+                    literal = clause[k]
+                    if (values[abs(literal)] if literal > 0 else -values[abs(literal)]) != -1:
+                        clause[1], clause[k] = literal, false
+                        watches[_index(literal)].append(clause)
+                        break
+                else:
+                    kept.append(clause)
+                    if first_value == -1:
+                        conflict = clause
+                        kept.extend(watchers[position + 1:])
+                        break
+                    self._assign(first, clause)
+
+            watches[_index(false)] = kept
+            if conflict is not None:
+                return conflict
+        return None
+
+    def _analyze(self, conflict):
+        """
+        Returns the clause learned from a conflict (first unique
+        implication point), with its asserting literal first, and
+        the decision level to backjump to.
+        """
+        level = len(self.limits)
+        seen = set()
+        learned = [None]
+        pending = 0
+        literal = None
+        index = len(self.trail) - 1
+        clause = conflict
+        while True:
+            for other in clause:
+                variable = abs(other)
+                if other == literal or variable in seen or self.levels[variable] == 0:
+                    continue
+                seen.add(variable)
+                self._bump(variable)
+                if self.levels[variable] == level:
+                    pending += 1
+                else:
+                    learned.append(other)
+
+            # Proximo literal do nivel atual envolvido no conflito
+            while abs(self.trail[index]) not in seen:
+                index -= 1
+            literal = self.trail[index]
+            index -= 1
+            pending -= 1
+            if pending == 0:
+                break
+            clause = self.reasons[abs(literal)]
+        learned[0] = -literal
+
+        # Volta ao maior nivel entre os demais literais, que passa a ser observado
+        backjump = 0
+        for k in range(1, len(learned)):
+            if self.levels[abs(learned[k])] > backjump:
+                backjump = self.levels[abs(learned[k])]
+                learned[1], learned[k] = learned[k], learned[1]
+        return learned, backjump
+
+    def _cancel(self, level):
+        """
+        Undoes every assignment above the given decision level.
+        """
+        if len(self.limits) <= level:
+            return
+        start = self.limits[level]
+        for literal in self.trail[start:]:
+            variable = abs(literal)
+            self.phase[variable] = literal > 0
+            self.values[variable] = 0
+            self.reasons[variable] = None
+            heapq.heappush(self.heap, (-self.activity[variable], variable))
+        del self.trail[start:]
+        del self.limits[level:]
+        self.head = len(self.trail)
+
+    def _bump(self, variable):
+        self.activity[variable] += self.increment
+        if self.activity[variable] > RESCALE:
+            self.activity = [activity / RESCALE for activity in self.activity]
+            self.increment /= RESCALE
+            self.heap = [(-self.activity[v], v) for v in range(1, self.num_variables + 1)
+                         if self.values[v] == 0]
+            heapq.heapify(self.heap)
+
+    def _pick(self):
+        """
+        Returns the free variable with the highest activity, or None.
+        """
+        while self.heap:
+            _, variable = heapq.heappop(self.heap)
+            if self.values[variable] == 0:
+                return variable
+        return None
+
+
+class Encoder():
+    """
+    Tseitin encoding of Sentences into the clauses of a Solver.
+    """
+
+    def __init__(self, solver):
+        self.solver = solver
+
+        # Variavel de cada simbolo, pelo nome, e literal de cada sentenca composta
+        self.variables = {}
+        self.literals = {}
+
+        # Literal sempre verdadeiro, para conjuncoes e disjuncoes vazias
+        self.true = None
+
+    def add(self, sentence):
+        """
+        Adds clauses stating that sentence is true.
+        """
+        if isinstance(sentence, And):
+            for conjunct in sentence.conjuncts:
+                self.add(conjunct)
+        elif isinstance(sentence, Or):
+            self.solver.add_clause([self.literal(disjunct)
+                                    for disjunct in sentence.disjuncts])
+        elif isinstance(sentence, Implication):
+            self.solver.add_clause([-self.literal(sentence.antecedent),
+                                    self.literal(sentence.consequent)])
+        else:
+            self.solver.add_clause([self.literal(sentence)])
+
+    def literal(self, sentence):
+        """
+        Returns a literal equivalent to sentence, adding the
+        clauses that define it if needed.
+        """
+        if isinstance(sentence, Symbol):
+            variable = self.variables.get(sentence.name)
+            if variable is None:
+                variable = self.variables[sentence.name] = self.solver.new_variable()
+            return variable
+        if isinstance(sentence, Not):
+            return -self.literal(sentence.operand)
+
+        literal = self.literals.get(sentence)
+        if literal is not None:
+            return literal
+
+        add_clause = self.solver.add_clause
+        if isinstance(sentence, (And, Or)):
+            parts = sentence.conjuncts if isinstance(sentence, And) else sentence.disjuncts
+            if not parts:
+                literal = self._true() if isinstance(sentence, And) else -self._true()
+            else:
+                # Uma disjuncao e a negacao da conjuncao das negacoes
+                sign = 1 if isinstance(sentence, And) else -1
+                operands = [sign * self.literal(part) for part in parts]
+                literal = self.solver.new_variable()
+                for operand in operands:
+                    add_clause([-literal, operand])
+                add_clause([literal] + [-operand for operand in operands])
+                literal *= sign
+        elif isinstance(sentence, Implication):
+            antecedent = self.literal(sentence.antecedent)
+            consequent = self.literal(sentence.consequent)
+            literal = self.solver.new_variable()
+            add_clause([-literal, -antecedent, consequent])
+            add_clause([literal, antecedent])
+            add_clause([literal, -consequent])
+        elif isinstance(sentence, Biconditional):
+            left = self.literal(sentence.left)
+            right = self.literal(sentence.right)
+            literal = self.solver.new_variable()
+            add_clause([-literal, -left, right])
+            add_clause([-literal, left, -right])
+            add_clause([literal, left, right])
+            add_clause([literal, -left, -right])
+        else:
+            raise TypeError("must be a logical sentence")
+
+        self.literals[sentence] = literal
+        return literal
+
+    def model(self):
+        """
+        Returns the solver's last solution as a dictionary
+        mapping each symbol's name to its value.
+        """
+        return {name: self.solver.model[variable]
+                for name, variable in self.variables.items()}
+
+    def _true(self):
+        if self.true is None:
+            self.true = self.solver.new_variable()
+            self.solver.add_clause([self.true])
+        return self.true
+
+
+def entails(knowledge, query):
+    """
+    Checks if knowledge base entails query, by checking that the
+    knowledge base has no model in which the query is false.
+    """
+    solver = Solver()
+    encoder = Encoder(solver)
+    encoder.add(knowledge)
+    return not solver.solve([-encoder.literal(query)])
+
+
+def entails_all(knowledge, queries):
+    """
+    Returns a dictionary mapping each of the queries to whether the
+    knowledge base entails it. The knowledge base is encoded once and
+    each query is checked as an assumption (see check_queries).
+    """
+    solver = Solver()
+    encoder = Encoder(solver)
+    encoder.add(knowledge)
+    return check_queries(encoder, queries)
+
+
+def check_queries(encoder, queries):
+    """
+    Returns a dictionary mapping each of the queries to whether the
+    clauses in the encoder's solver entail it, checking each query as
+    the assumption that it is false, so clauses learned for one query
+    help with the next; every model found along the way refutes all of
+    the remaining queries that are false in it.
+    """
+    solver = encoder.solver
+    literals = {query: encoder.literal(query) for query in queries}
+
+    results = {}
+    for query, literal in literals.items():
+        if query in results:
+            continue
+        if not solver.solve([-literal]):
+            results[query] = True
+            continue
+        model = solver.model
+        for other, other_literal in literals.items():
+            if other not in results and model[abs(other_literal)] != (other_literal > 0):
+                results[other] = False
+    return results
+
+
+def _index(literal):
+    """
+    Position of a literal's watch list: 2v for v and 2v + 1 for -v.
+    """
+    return 2 * literal if literal > 0 else 1 - 2 * literal
@@ -0,0 +1,43 @@
+import random
+import unittest
+
+from logic import And, KnowledgeBase, Or, model_check
+from test_sat import random_sentence
+
+
+class KnowledgeBaseTest(unittest.TestCase):
+
+    def test_matches_brute_force(self):
+        rng = random.Random(0)
+        for _ in range(50):
+            knowledge = KnowledgeBase()
+            sentences = []
+
+            # Cada consulta e feita sobre a base ja com as sentencas anteriores
+            for _ in range(rng.randint(1, 8)):
+                sentence = random_sentence(rng, 3)
+                knowledge.add(sentence)
+                sentences.append(sentence)
+                conjunction = And(*sentences)
+                self.assertEqual(len(knowledge), len(sentences))
+
+                self.assertEqual(knowledge.satisfiable(),
+                                 not model_check(conjunction, Or(), method="enumerate"))
+                queries = [random_sentence(rng, 2) for _ in range(4)]
+                for query in queries:
+                    self.assertEqual(knowledge.entails(query),
+                                     model_check(conjunction, query, method="enumerate"),
+                                     (sentences, query))
+                self.assertEqual(knowledge.entails_all(queries), {
+                    query: model_check(conjunction, query, method="enumerate")
+                    for query in queries
+                })
+
+    def test_sentence(self):
+        rng = random.Random(1)
+        sentences = [random_sentence(rng, 2) for _ in range(3)]
+        self.assertEqual(KnowledgeBase(*sentences).sentence(), And(*sentences))
+
+
+if __name__ == "__main__":
+    unittest.main()
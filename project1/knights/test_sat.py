@@ -0,0 +1,111 @@
+import itertools
+import random
+import unittest
+
+from logic import (And, Biconditional, Implication, Not, Or, Symbol,
+                   model_check, model_check_all)
+from sat import Encoder, Solver
+
+SYMBOLS = [Symbol(name) for name in "ABCDEF"]
+
+
+def random_sentence(rng, depth):
+    """
+    Returns a random sentence over SYMBOLS nested up to depth levels.
+    """
+    if depth == 0 or rng.random() < 0.2:
+        return rng.choice(SYMBOLS)
+    kind = rng.randrange(5)
+    if kind == 0:
+        return Not(random_sentence(rng, depth - 1))
+    if kind == 1:
+        return And(*[random_sentence(rng, depth - 1) for _ in range(rng.randint(0, 3))])
+    if kind == 2:
+        return Or(*[random_sentence(rng, depth - 1) for _ in range(rng.randint(0, 3))])
+    if kind == 3:
+        return Implication(random_sentence(rng, depth - 1), random_sentence(rng, depth - 1))
+    return Biconditional(random_sentence(rng, depth - 1), random_sentence(rng, depth - 1))
+
+
+def satisfiable(clauses, num_variables, assumptions=()):
+    """
+    Checks by brute force if some assignment satisfies
+    the clauses and the assumption literals.
+    """
+    for values in itertools.product((False, True), repeat=num_variables):
+        def true(literal):
+            return values[abs(literal) - 1] == (literal > 0)
+        if all(map(true, assumptions)) and all(any(map(true, clause)) for clause in clauses):
+            return True
+    return False
+
+
+class SolverTest(unittest.TestCase):
+
+    def test_matches_brute_force(self):
+        rng = random.Random(0)
+        for _ in range(200):
+            num_variables = rng.randint(1, 8)
+            solver = Solver()
+            for _ in range(num_variables):
+                solver.new_variable()
+
+            # As clausulas sao adicionadas aos poucos, resolvendo entre elas
+            clauses = []
+            for _ in range(rng.randint(1, 4 * num_variables)):
+                clause = [rng.choice((1, -1)) * rng.randint(1, num_variables)
+                          for _ in range(rng.randint(1, 3))]
+                clauses.append(clause)
+                solver.add_clause(clause)
+                assumptions = [rng.choice((1, -1)) * rng.randint(1, num_variables)
+                               for _ in range(rng.randint(0, 2))]
+
+                expected = satisfiable(clauses, num_variables, assumptions)
+                self.assertEqual(solver.solve(assumptions), expected, (clauses, assumptions))
+                if expected:
+                    model = solver.model
+                    for literal in assumptions:
+                        self.assertEqual(model[abs(literal)], literal > 0)
+                    for clause in clauses:
+                        self.assertTrue(any(model[abs(literal)] == (literal > 0)
+                                            for literal in clause))
+
+    def test_encoder_model(self):
+        rng = random.Random(1)
+        for _ in range(300):
+            sentence = random_sentence(rng, 4)
+            solver = Solver()
+            encoder = Encoder(solver)
+            encoder.add(sentence)
+            if solver.solve():
+                model = encoder.model()
+                for symbol in SYMBOLS:
+                    model.setdefault(symbol.name, False)
+                self.assertTrue(sentence.evaluate(model), sentence)
+            else:
+                self.assertTrue(model_check(sentence, Or(), method="enumerate"), sentence)
+
+
+class ModelCheckTest(unittest.TestCase):
+
+    def test_matches_enumeration(self):
+        rng = random.Random(2)
+        for _ in range(1000):
+            knowledge = random_sentence(rng, 4)
+            query = random_sentence(rng, 3)
+            self.assertEqual(model_check(knowledge, query),
+                             model_check(knowledge, query, method="enumerate"),
+                             (knowledge, query))
+
+    def test_all_matches_enumeration(self):
+        rng = random.Random(3)
+        for _ in range(200):
+            knowledge = random_sentence(rng, 4)
+            queries = [random_sentence(rng, 2) for _ in range(5)]
+            self.assertEqual(model_check_all(knowledge, queries),
+                             model_check_all(knowledge, queries, method="enumerate"),
+                             (knowledge, queries))
+
+
+if __name__ == "__main__":
+    unittest.main()
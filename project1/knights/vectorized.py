@@ -0,0 +1,122 @@
+"""
+Vectorized truth-table backend for logic.model_check, using NumPy.
+
+All assignments of n symbols are numbered 0 to 2^n - 1, the value of
+the i-th symbol in assignment a being bit i of a. A sentence's truth
+table is then a packed array of 2^n bits, one per assignment, stored in
+64-bit words, and each connective is a single bitwise operation over
+whole arrays. The knowledge base entails the query when no bit is set
+in table(knowledge) & ~table(query).
+"""
+
+import numpy as np
+
+from logic import And, Biconditional, Implication, Not, Or, Symbol
+
+# Atribuicoes por palavra do vetor de bits
+WORD_BITS = 64
+
+# Bits das tabelas avaliadas de uma vez: com mais simbolos, as
+# atribuicoes sao percorridas em blocos deste tamanho
+BLOCK_SYMBOLS = 24
+
+ALL = np.uint64(2 ** 64 - 1)
+
+# Palavra com o bit t ligado quando o bit i de t esta ligado, para cada
+# simbolo i que varia dentro de uma mesma palavra
+WORD_PATTERNS = [
+    np.uint64(sum(1 << t for t in range(WORD_BITS) if t >> i & 1))
+    for i in range(6)
+]
+
+
+def entails(knowledge, query):
+    """
+    Checks if knowledge base entails query, evaluating both
+    over every assignment of their symbols at once.
+    """
+    return entails_all(knowledge, [query])[query]
+
+
+def entails_all(knowledge, queries):
+    """
+    Returns a dictionary mapping each of the queries to whether the
+    knowledge base entails it, computing the knowledge base's truth
+    table only once.
+    """
+    symbols = sorted(knowledge.symbols().union(*[query.symbols() for query in queries]))
+    block = min(len(symbols), BLOCK_SYMBOLS)
+    words = max(1, 2 ** block // WORD_BITS)
+
+    # Blocos com menos de 64 atribuicoes usam so os bits mais baixos
+    valid = ALL if block >= 6 else np.uint64(2 ** (2 ** block) - 1)
+
+    index = np.arange(words, dtype=np.uint64)
+    columns = {}
+    for i, name in enumerate(symbols[:block]):
+        if i < 6:
+            columns[name] = np.full(words, WORD_PATTERNS[i])
+        else:
+            columns[name] = np.where(index >> np.uint64(i - 6) & np.uint64(1), ALL, np.uint64(0))
+
+    results = dict.fromkeys(queries, True)
+
+    # Os simbolos alem do bloco tem o mesmo valor em todo o bloco
+    for number in range(2 ** (len(symbols) - block)):
+        for i, name in enumerate(symbols[block:]):
+            columns[name] = np.full(words, ALL if number >> i & 1 else np.uint64(0))
+        tables = {}
+        models = truth_table(knowledge, columns, tables) & valid
+        if not models.any():
+            continue
+        for query, entailed in results.items():
+            if entailed and (models & ~truth_table(query, columns, tables)).any():
+                results[query] = False
+    return results
+
+
+def truth_table(sentence, columns, tables=None):
+    """
+    Returns the packed truth table of sentence, given the table of each
+    symbol by name in columns. If tables is a dictionary, it caches the
+    tables of subsentences, so repeated ones are evaluated only once.
+    """
+    if isinstance(sentence, Symbol):
+        try:
+            return columns[sentence.name]
+        except KeyError:
+            raise Exception(f"variable {sentence.name} not in model")
+    if tables is not None and sentence in tables:
+        return tables[sentence]
+
+    if isinstance(sentence, Not):
+        table = ~truth_table(sentence.operand, columns, tables)
+    elif isinstance(sentence, And):
+        table = _fold(np.bitwise_and, sentence.conjuncts, columns, tables, ALL)
+    elif isinstance(sentence, Or):
+        table = _fold(np.bitwise_or, sentence.disjuncts, columns, tables, np.uint64(0))
+    elif isinstance(sentence, Implication):
+        table = (~truth_table(sentence.antecedent, columns, tables)
+                 | truth_table(sentence.consequent, columns, tables))
+    elif isinstance(sentence, Biconditional):
+        table = ~(truth_table(sentence.left, columns, tables)
+                  ^ truth_table(sentence.right, columns, tables))
+    else:
+        raise TypeError("must be a logical sentence")
+
+    if tables is not None:
+        tables[sentence] = table
+    return table
+
+
+def _fold(operation, sentences, columns, tables, identity):
+    """
+    Combines the truth tables of sentences with a bitwise operation.
+    """
+    if not sentences:
+        words = len(next(iter(columns.values()))) if columns else 1
+        return np.full(words, identity)
+    table = truth_table(sentences[0], columns, tables)
+    for sentence in sentences[1:]:
+        table = operation(table, truth_table(sentence, columns, tables))
+    return table